@@ -0,0 +1,95 @@
+"""
+Compare rendering synthetic sets of cards serially, on a thread pool and on a process
+pool. Threads only help on a free-threaded build of Python (3.13t and later), where
+they skip the cost of starting processes and pickling cards. Run from the repository
+root, optionally giving the set sizes to try:
+
+    python benchmarks/bench_render.py [10000 100000]
+"""
+
+import functools
+import os
+import sys
+import time
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src", "CSV2MSE")
+)
+
+import card_importer  # noqa: E402
+import pipeline  # noqa: E402
+
+SIZES = [10_000, 100_000]
+
+COLUMN_MAPPING = {
+    "name": "name",
+    "casting_cost": "cost",
+    "super_type": "supertype",
+    "card_type": "cardtype",
+    "sub_type": "subtype",
+    "rarity": "rarity",
+    "rule_text": "rulestext",
+    "flavor_text": "flavortext",
+    "power": "power",
+    "toughness": "toughness",
+    "loyalty": "loyalty",
+    "stylesheet": "stylesheet",
+}
+
+TYPES = ["Creature", "Instant", "Legendary Planeswalker", "Artifact Creature", "Land"]
+RARITIES = ["common", "uncommon", "rare", "mythic"]
+
+
+def make_cards(count: int) -> list[dict[str, str]]:
+    """
+    Make `count` cards with a mix of card types and a few lines of rules text each.
+    """
+    return [
+        {
+            "name": f"Card {i}",
+            "cost": "{2}{W}{U}",
+            "supertype": "",
+            "cardtype": TYPES[i % len(TYPES)],
+            "subtype": "Human Wizard",
+            "rarity": RARITIES[i % len(RARITIES)],
+            "rulestext": "Flying\n{T}: Draw a card, then discard a card.\n"
+            "Whenever ~ attacks, create a 1/1 white Soldier creature token.",
+            "flavortext": "&quot;Every card tells a story.&quot;",
+            "power": "2",
+            "toughness": "3",
+            "loyalty": "4",
+        }
+        for i in range(count)
+    ]
+
+
+def time_executor(executor: str, cards: list[dict[str, str]]) -> float:
+    """
+    Render every card with the given executor. Returns the wall time in seconds.
+    """
+    render = functools.partial(
+        card_importer.render_card_file,
+        column_mapping=COLUMN_MAPPING,
+        now="2024-01-01 00:00:00",
+    )
+    start = time.perf_counter()
+    for _ in pipeline.map_ordered(render, enumerate(cards), executor):
+        pass
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    gil = "free-threaded" if pipeline.is_free_threaded() else "GIL enabled"
+    print(f"Python {sys.version.split()[0]} ({gil}), {os.cpu_count()} cores")
+
+    for size in sizes:
+        cards = make_cards(size)
+        for executor in pipeline.EXECUTORS:
+            seconds = time_executor(executor, cards)
+            print(f"{size} cards, {executor}: {seconds:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
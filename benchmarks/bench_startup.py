@@ -0,0 +1,58 @@
+"""
+Measure how long the converter takes to start, and fail if it goes over budget.
+
+Batch jobs run the converter thousands of times on small sets, so startup time adds
+up. Run from the repository root:
+
+    python benchmarks/bench_startup.py
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+RUNS = 20
+
+# Median wall time in milliseconds, including starting the interpreter itself. The
+# budgets sit just above what was measured, so a slower start shows up
+BUDGETS = {
+    "interpreter": ([sys.executable, "-c", "pass"], None),
+    "import package": ([sys.executable, "-c", "import CSV2MSE"], 40),
+    "main --help": (
+        [sys.executable, os.path.join("CSV2MSE", "main.py"), "--help"],
+        100,
+    ),
+}
+
+
+def time_command(command: list[str]) -> float:
+    """
+    Run a command several times and return the median wall time in milliseconds.
+    """
+    times = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=SRC_DIR, check=True, stdout=subprocess.DEVNULL)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main() -> int:
+    over_budget = False
+    for name, (command, budget) in BUDGETS.items():
+        median = time_command(command)
+        status = ""
+        if budget is not None:
+            status = f" (budget {budget} ms)"
+            if median > budget:
+                status += " OVER BUDGET"
+                over_budget = True
+        print(f"{name}: {median:.1f} ms{status}")
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,4 +6,5 @@ setup(
     version=versioneer.get_version(),
     cmdclass=versioneer.get_cmdclass(),
     description="Generic CSV to MSE importer",
+    extras_require={"zstd": ["zstandard"]},
 )
\ No newline at end of file
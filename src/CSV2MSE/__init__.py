@@ -1,4 +1,47 @@
-from . import _version, card_importer, card_parser, main
+import importlib
+from typing import Any
 
-__version__ = _version.get_versions()["version"]
-__all__ = ["card_importer", "card_parser", "main"]
+# Submodules are only imported when first used, so that importing the package (or
+# running the command line tool) doesn't pay for tkinter, zipfile and friends up front
+__all__ = [
+    "card_exporter",
+    "card_importer",
+    "card_parser",
+    "card_validator",
+    "checkpoint",
+    "csv_reader",
+    "decompress",
+    "daemon",
+    "daemon_client",
+    "json_reader",
+    "main",
+    "pipeline",
+    "quarantine",
+    "result_cache",
+    "row_filter",
+    "scryfall_importer",
+    "set_diff",
+    "set_reader",
+    "set_updater",
+    "shards",
+    "sinks",
+    "spreadsheet_reader",
+]
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        # Resolving the version can mean asking git, so wait until it's asked for
+        from . import _version
+
+        globals()[name] = _version.get_versions()["version"]
+        return globals()[name]
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *__all__, "__version__"])
@@ -0,0 +1,56 @@
+import csv
+from typing import Iterable, Mapping
+
+import card_parser
+import set_reader
+
+
+def card_to_row(
+    card: Mapping[str, str], column_mapping: Mapping[str, str]
+) -> dict[str, str]:
+    """
+    Convert a card read from an MSE set back into a CSV row, reversing the formatting
+    applied by `process_csv`.
+    """
+    card = dict(card)
+
+    # Planeswalkers keep their rules text in `level_1_text` instead of `rule_text`
+    for col, rule_col in card_parser.PLANESWALKER_TEXT.items():
+        if not card.get(rule_col) and card.get(col):
+            card[rule_col] = card[col]
+
+    row = {}
+    for col, csv_col in column_mapping.items():
+        if row.get(csv_col) or not card.get(col):
+            continue
+        val = card_parser.unfix_multiline_text(card[col])
+        row[csv_col] = card_parser.unfix_symbols(val)
+
+    return row
+
+
+def write_csv(
+    filename: str, column_mapping: Mapping[str, str], cards: Iterable[dict[str, str]]
+) -> int:
+    """
+    Write cards read from an MSE set to a CSV file, using the column names from the
+    config file as the header. Returns the number of cards written.
+    """
+    header = list(dict.fromkeys(column_mapping.values()))
+
+    count = 0
+    with open(filename, "w", encoding="utf8", newline="") as f:
+        writer = csv.DictWriter(f, header)
+        writer.writeheader()
+        for card in cards:
+            writer.writerow(card_to_row(card, column_mapping))
+            count += 1
+
+    return count
+
+
+def export_set(set_path: str, filename: str, column_mapping: Mapping[str, str]) -> int:
+    """
+    Stream every card out of an .mse-set file and into a CSV file.
+    """
+    return write_csv(filename, column_mapping, set_reader.iter_cards(set_path))
@@ -1,21 +1,117 @@
+import ast
 import configparser
+import contextlib
 import csv
+import datetime as dt
+import fnmatch
+import functools
+import glob
+import hashlib
+import importlib
+import itertools
 import os
+import re
 import shutil
-from tkinter import filedialog as fd
-from typing import Iterable
+import types
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping, TypeVar
 
 import card_parser
+import checkpoint
+import decompress
+import pipeline
+import row_filter
 
+if TYPE_CHECKING:
+    import sinks
 
-def read_config_file() -> tuple[dict[str, str], dict[str, str]]:
+T = TypeVar("T")
+
+# Cards read up front to estimate how big a run is
+SAMPLE_SIZE = 100
+
+# Rough cost of rendering a card, from benchmarks/bench_render.py
+RENDER_SECONDS_PER_CARD = 30e-6
+RENDER_SECONDS_PER_CHAR = 0.4e-6
+
+# CSV files at least this big are parsed in parallel, four of csv_reader's chunks
+PARALLEL_CSV_BYTES = 64 * 2**20
+
+# Bytes that aren't valid UTF-8, as decoded with errors="surrogateescape"
+UNDECODABLE = re.compile("[\udc80-\udcff]")
+
+# Errors rendering a card raises when its values don't fit the column mapping
+RENDER_ERRORS = (KeyError, ValueError)
+
+# Errors readers raise when a file turns out to be broken part-way through. XML that
+# can't be parsed raises a SyntaxError
+READ_ERRORS = (csv.Error, EOFError, KeyError, SyntaxError, ValueError)
+
+# Called with the stage, file, row number, error and cells of a row that can't be used
+ErrorHandler = Callable[[str, str, int, str, Iterable[str]], None]
+
+
+class Card(dict[str, str]):
+    """
+    A card's values by column name, along with the file and row it was read from, so
+    problems found with it later can be traced back to the input. Rows are numbered
+    from 1 for the header, and records from 1.
+    """
+
+    def __init__(
+        self,
+        values: Mapping[str, str] | Iterable[tuple[str, str]] = (),
+        source: str = "",
+        row: int = 0,
+    ) -> None:
+        super().__init__(values)
+        self.source = source
+        self.row = row
+
+
+def card_origin(card: Mapping[str, str], index: int) -> tuple[str, int]:
+    """
+    Get the file and row a card was read from. Cards that weren't read from a file,
+    such as Scryfall cards, are numbered by their index in the input, counting from 1.
+    """
+    if isinstance(card, Card):
+        return card.source, card.row
+    return "", index
+
+
+def select_file(prompt: str) -> str:
+    """
+    Ask the user to pick a file with a pop-up dialog. Returns the selected path.
+    """
+    # Imported here so runs that never show a dialog don't pay for loading tkinter
+    from tkinter import filedialog as fd
+
+    print(prompt)
+    return fd.askopenfilename()
+
+
+def select_files(prompt: str) -> list[str]:
     """
-    Read the configuration details given in the provided config file. Returns two
-    dictionaries: one with metadata about the set, and one with mappings between
-    the CSV file and the canonical MSE field names.
+    Ask the user to pick one or more files with a pop-up dialog. Returns the selected
+    paths.
     """
-    print("Select metadata config file:")
-    filename = fd.askopenfilename()
+    from tkinter import filedialog as fd
+
+    print(prompt)
+    return list(fd.askopenfilenames())
+
+
+def read_config_file(
+    filename: str = "",
+) -> tuple[dict[str, str], Mapping[str, str], dict[str, dict[str, str]]]:
+    """
+    Read the configuration details given in the provided config file, prompting the
+    user to select one if no filename is given. Returns three dictionaries: one with
+    metadata about the set, one with mappings between the CSV file and the canonical
+    MSE field names, and one with column renames for input files that use their own
+    column names, keyed by file name pattern. The column mapping is read-only, since
+    it is shared by every card.
+    """
+    filename = filename or select_file("Select metadata config file:")
 
     config = configparser.ConfigParser()
     config.read(filename, encoding="utf8")
@@ -32,19 +128,26 @@ def read_config_file() -> tuple[dict[str, str], dict[str, str]]:
         key: config["card"].get(key, "").lower() or key for key in config["card"]
     }
 
-    return metadata, columns
+    # Sections like [card:tokens*.csv] override the mapping for matching files
+    renames = {}
+    for section in config.sections():
+        if section.startswith("card:"):
+            renames[section[len("card:") :]] = {
+                config[section].get(key, "").lower() or key: columns.get(key, key)
+                for key in config[section]
+            }
+
+    return metadata, types.MappingProxyType(columns), renames
 
 
-def create_set_dir(metadata: dict[str, str]) -> str:
+def confirm_overwrite(set_dir: str, assume_yes: bool = False) -> bool:
     """
-    Generate an empty set file for MSE 2.0 and add any set details from the metadata
-    dictionary. Defaults to using the m15-altered stylesheet. Returns name of set file.
+    If the set already exists, ask the user whether to overwrite it and delete it if
+    so. Returns whether it's safe to write the set.
     """
-    set_dir = metadata["title"] + ".mse-set"
-
     # Check to overwrite existing folder
     if os.path.exists(set_dir):
-        overwrite = ""
+        overwrite = "y" if assume_yes else ""
         while overwrite not in ["y", "n"]:
             overwrite = input("Overwrite existing set file? Y/N: ").lower()
         if overwrite == "y":
@@ -54,7 +157,19 @@ def create_set_dir(metadata: dict[str, str]) -> str:
                 shutil.rmtree(set_dir)
         else:
             print("Aborting.")
-            return ""
+            return False
+
+    return True
+
+
+def create_set_dir(metadata: dict[str, str], assume_yes: bool = False) -> str:
+    """
+    Generate an empty set file for MSE 2.0 and add any set details from the metadata
+    dictionary. Defaults to using the m15-altered stylesheet. Returns name of set file.
+    """
+    set_dir = metadata["title"] + ".mse-set"
+    if not confirm_overwrite(set_dir, assume_yes):
+        return ""
 
     os.mkdir(set_dir)
 
@@ -69,109 +184,691 @@ def create_set_dir(metadata: dict[str, str]) -> str:
     return set_dir
 
 
-def read_csv() -> list[dict[str, str]]:
+def expand_inputs(patterns: Iterable[str]) -> list[str]:
     """
-    Prompt the user to select a CSV file, then import each line as a dictionary
-    mapping the row's value to the column name. Returns list of cards.
+    Expand any glob patterns in the list of input files, keeping the order they were
+    given in. Matches for a single pattern are sorted by name.
     """
-    print("Select csv file:")
-    filename = fd.askopenfilename()
+    filenames = []
+    for pattern in patterns:
+        if any(char in pattern for char in "*?["):
+            filenames.extend(sorted(glob.glob(pattern)))
+        else:
+            filenames.append(pattern)
+    return filenames
+
+
+def iter_csv_rows(filename: str) -> Iterator[list[str]]:
+    """
+    Stream the rows of a CSV file as lists of cell values. Large files are split into
+    chunks that are parsed on several cores at once, if there are several, and
+    compressed files are decompressed as they are read. Bytes that aren't valid UTF-8
+    are kept as surrogate characters, so they can be caught one row at a time.
+    """
+    if decompress.detect_compression(filename):
+        with decompress.open_text(filename, errors="surrogateescape") as f:
+            yield from csv.reader(f)
+        return
+
+    executor = pipeline.default_executor()
+    if executor != "serial" and os.path.getsize(filename) >= PARALLEL_CSV_BYTES:
+        import csv_reader
+
+        yield from csv_reader.iter_rows_parallel(filename, executor)
+        return
+
+    with open(filename, "r", encoding="utf8", errors="surrogateescape") as f:
+        yield from csv.reader(f)
+
+
+def skip_bad_rows(
+    rows: Iterable[tuple[int, list[str]]], filename: str, on_error: ErrorHandler
+) -> Iterator[tuple[int, list[str]]]:
+    """
+    Pass on the numbered rows of a CSV file, leaving out and reporting rows that have
+    more cells than the header, usually from an unquoted comma, or bytes that aren't
+    valid UTF-8. Rows are numbered from 1 for the header.
+    """
+    width = 0
+    for number, row in rows:
+        if number == 1:
+            width = len(row)
+        elif any(row[width:]):
+            error = f"{len(row)} cells, but the header only has {width}"
+            on_error("read", filename, number, error, row)
+            continue
+        elif UNDECODABLE.search("".join(row)):
+            on_error("read", filename, number, "text that isn't valid UTF-8", row)
+            continue
+        yield number, row
+
+
+def suggest_columns(
+    missing: Iterable[str], candidates: Iterable[str]
+) -> dict[str, str]:
+    """
+    Find the columns that missing column names were most likely meant to be, e.g.
+    `flavourtext` for `flavortext`. Each candidate is only suggested for the name it is
+    closest to. Returns the suggestions keyed by missing name.
+    """
+    # Only needed when a column is missing, so not loaded up front
+    import difflib
+
+    candidates = list(candidates)
+    scored = []
+    for name in missing:
+        matcher = difflib.SequenceMatcher(b=name)
+        for candidate in candidates:
+            matcher.set_seq1(candidate)
+            if (ratio := matcher.ratio()) >= 0.75:
+                scored.append((ratio, name, candidate))
+
+    suggestions: dict[str, str] = {}
+    for _, name, candidate in sorted(scored, reverse=True):
+        if name not in suggestions and candidate not in suggestions.values():
+            suggestions[name] = candidate
+    return suggestions
+
+
+def normalize_header(
+    header: list[str], rename: dict[str, str] | None = None
+) -> list[str]:
+    """
+    Turn the cells of a header row into column names, renaming columns that this file
+    names differently.
+    """
+    rename = rename or {}
+    names = [key.strip().lower() for key in header]
+    return [rename.get(name, name) for name in names]
+
+
+def index_header(
+    names: list[str], columns: Iterable[str] | None = None, filename: str = ""
+) -> list[tuple[str, int]]:
+    """
+    Work out where each column is, once per file. Returns pairs of column name and
+    position, keeping only `columns` if given. Wanted columns that aren't in the
+    header but look like a misspelling of one that is get a warning.
+    """
+    if columns is None:
+        return [(name, i) for i, name in enumerate(names)]
+
+    wanted = set(columns)
+    unused = [name for name in names if name not in wanted]
+    if missing := wanted - set(names):
+        for name, match in sorted(suggest_columns(missing, unused).items()):
+            print(f"Column {name!r} not found in {filename}, did you mean {match!r}?")
+
+    return [(name, i) for i, name in enumerate(names) if name in wanted]
+
+
+def bind_filter(
+    where: ast.expr, names: list[str], filename: str = ""
+) -> Callable[[list[str]], bool]:
+    """
+    Compile a `--where` filter for the rows of a table with the given column names,
+    so each row is checked by position before it is turned into a card. Columns the
+    filter uses that the table doesn't have are empty, with a warning.
+    """
+    positions: dict[str, int] = {}
+    for i, name in enumerate(names):
+        positions.setdefault(name, i)
+
+    if missing := row_filter.column_names(where) - set(positions):
+        suggestions = suggest_columns(missing, positions)
+        for name in sorted(missing):
+            match = suggestions.get(name)
+            hint = f", did you mean {match!r}?" if match else ""
+            print(f"Column {name!r} in --where not found in {filename}{hint}")
+
+    def getter(name: str) -> Callable[[list[str]], str]:
+        if (i := positions.get(name)) is None:
+            return lambda row: ""
+        return lambda row: row[i].strip() if i < len(row) else ""
+
+    return row_filter.compile_filter(where, getter)
+
+
+def iter_table(
+    rows: Iterable[tuple[int, list[str]]],
+    rename: dict[str, str] | None = None,
+    columns: Iterable[str] | None = None,
+    filename: str = "",
+    where: ast.expr | None = None,
+) -> Iterator[Card]:
+    """
+    Turn the numbered rows of a table into cards mapping each value to its column
+    name, using the first row as the header. The header is indexed once, so each row
+    only picks out the values it needs by position. Blank rows are skipped, as are
+    rows that don't match the `where` filter, before any card is built.
+    """
+    index: list[tuple[str, int]] | None = None
+    keep: Callable[[list[str]], bool] | None = None
+    for number, row in rows:
+        if index is None:
+            names = normalize_header(row, rename)
+            index = index_header(names, columns, filename)
+            if where is not None:
+                keep = bind_filter(where, names, filename)
+        # On subsequent loops, read card info but skip blank lines
+        elif any(len(r) for r in row) and (keep is None or keep(row)):
+            values = ((key, row[i].strip()) for key, i in index if i < len(row))
+            yield Card(values, filename, number)
+
+
+def skip_broken_file(
+    items: Iterable[tuple[int, T]], filename: str, on_error: ErrorHandler
+) -> Iterator[tuple[int, T]]:
+    """
+    Pass on the numbered rows or records of a file. If the file turns out to be
+    broken part-way through, the rest of it is reported as one bad row and skipped
+    instead of stopping the run, since there's no telling where the next good row
+    starts.
+    """
+    # Damaged workbooks raise BadZipFile, imported here to keep startup fast
+    import zipfile
+
+    number = 0
+    try:
+        for number, item in items:
+            yield number, item
+    except (*READ_ERRORS, zipfile.BadZipFile) as e:
+        error = f"{type(e).__name__}: {e}, skipped the rest of the file"
+        on_error("read", filename, number + 1, error, [])
+
+
+def lazy_reader(module: str, name: str) -> Callable[..., Any]:
+    """
+    Get a reader that only imports its module when a file is first read with it, so
+    starting up doesn't pay for zipfile, the XML parser and the JSON decoder.
+    """
+
+    def read(*args: Any) -> Any:
+        return getattr(importlib.import_module(module), name)(*args)
+
+    return read
 
-    header, body = [], []
-    with open(filename, "r", encoding="utf8") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if not header:
-                header = row
-            # On subsequent loops, read card info but skip blank lines
-            elif any(len(r) for r in row):
-                body.append(
-                    {key.strip().lower(): val.strip() for key, val in zip(header, row)}
-                )
 
-    return body
+def input_path(filename: str) -> str:
+    """
+    Get the path of the file an input is read from, without the sheet name of a
+    workbook.
+    """
+    if "#" not in filename:
+        return filename
+    import spreadsheet_reader
+
+    return spreadsheet_reader.split_sheet(filename)[0]
+
+
+# Functions that stream the rows of a table, by file extension
+TABLE_READERS: dict[str, Callable[[str], Iterable[list[str]]]] = {
+    ".csv": iter_csv_rows,
+    ".xlsx": lazy_reader("spreadsheet_reader", "iter_xlsx_rows"),
+    ".ods": lazy_reader("spreadsheet_reader", "iter_ods_rows"),
+}
+
+# Functions that stream the records of a structured file, by file extension. Records
+# that can't be decoded are passed to the callback with the error, if given
+RECORD_READERS: dict[
+    str, Callable[[str, Callable[[str, str], None] | None], Iterable[dict[str, str]]]
+] = {
+    ".json": lazy_reader("json_reader", "iter_json_records"),
+    ".jsonl": lazy_reader("json_reader", "iter_json_records"),
+    ".ndjson": lazy_reader("json_reader", "iter_json_records"),
+}
+
+
+def iter_file(
+    filename: str,
+    rename: dict[str, str],
+    columns: Iterable[str] | None = None,
+    on_error: ErrorHandler | None = None,
+    where: ast.expr | None = None,
+) -> Iterator[Card]:
+    """
+    Stream each row or record of an input file as a card mapping its values to their
+    column names, renaming columns that this file names differently
+    and keeping only `columns` if given. The reader is picked by file extension,
+    ignoring any compression extension, and falls back to CSV. If `on_error` is
+    given, rows and records that can't be read are passed to it instead of being
+    used, as is the rest of a file that turns out to be broken. Only rows matching
+    the `where` filter, if given, are passed on.
+    """
+    ext = os.path.splitext(decompress.strip_suffix(input_path(filename)))[1].lower()
+    if ext not in RECORD_READERS:
+        reader = TABLE_READERS.get(ext, iter_csv_rows)
+        rows: Iterable[tuple[int, list[str]]] = enumerate(reader(filename), 1)
+        if on_error:
+            rows = skip_broken_file(rows, filename, on_error)
+        if on_error and reader is iter_csv_rows:
+            rows = skip_bad_rows(rows, filename, on_error)
+        yield from iter_table(rows, rename, columns, filename, where)
+        return
+
+    keep = None
+    if where is not None:
+        # Look columns up by the name they have in this file
+        original = {new: old for old, new in rename.items()}
+        keep = row_filter.compile_filter(
+            where, lambda name: lambda card: card.get(original.get(name, name), "")
+        )
+
+    # Records that can't be decoded are numbered too, so the rest keep their numbers
+    number = 0
+
+    def skip_record(text: str, error: str) -> None:
+        nonlocal number
+        number += 1
+        assert on_error is not None
+        on_error("read", filename, number, error, [text])
+
+    def number_records() -> Iterator[tuple[int, dict[str, str]]]:
+        nonlocal number
+        for card in RECORD_READERS[ext](filename, skip_record if on_error else None):
+            number += 1
+            yield number, card
+
+    records = number_records()
+    if on_error:
+        records = skip_broken_file(records, filename, on_error)
+
+    wanted = None if columns is None else set(columns)
+    for row, card in records:
+        if any(card.values()) and (keep is None or keep(card)):
+            values = (
+                (rename.get(k, k), v)
+                for k, v in card.items()
+                if wanted is None or rename.get(k, k) in wanted
+            )
+            yield Card(values, filename, row)
+
+
+def read_file(
+    filename: str,
+    rename: dict[str, str],
+    columns: Iterable[str] | None = None,
+    on_error: ErrorHandler | None = None,
+    where: ast.expr | None = None,
+) -> list[Card]:
+    """
+    Import every card of an input file. Returns list of cards.
+    """
+    return list(iter_file(filename, rename, columns, on_error, where))
+
+
+def iter_cards(
+    filenames: Iterable[str] = (),
+    renames: dict[str, dict[str, str]] | None = None,
+    columns: Iterable[str] | None = None,
+    on_error: ErrorHandler | None = None,
+    where: ast.expr | None = None,
+) -> Iterator[Card]:
+    """
+    Stream the cards from one or more CSV, spreadsheet or JSON files, prompting the
+    user to select files if none are given. Only the values of `columns` are kept, if
+    given, CSV rows that can't be read are passed to `on_error`, if given, and only
+    cards matching the `where` filter are read. A single file is streamed as it is
+    read; several files are read in parallel and their cards passed on in the order
+    the files were given, as soon as each file is done.
+    """
+    filenames = expand_inputs(filenames) or select_files("Select csv files:")
+    renames = renames or {}
+    columns = None if columns is None else list(columns)
+
+    # Use the column renames of the first matching [card:...] section
+    file_renames = [
+        next(
+            (
+                rename
+                for pattern, rename in renames.items()
+                if fnmatch.fnmatch(os.path.basename(filename), pattern)
+            ),
+            {},
+        )
+        for filename in filenames
+    ]
+
+    if len(filenames) == 1:
+        yield from iter_file(filenames[0], file_renames[0], columns, on_error, where)
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = min(len(filenames), os.cpu_count() or 1) or 1
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for table in pool.map(
+            read_file,
+            filenames,
+            file_renames,
+            [columns] * len(filenames),
+            [on_error] * len(filenames),
+            [where] * len(filenames),
+        ):
+            yield from table
+
+
+def input_chars(filename: str, last_row: int) -> int:
+    """
+    Count roughly how many characters of a file hold its rows or records up to
+    `last_row`, numbered as cards are, leaving out a table's header. Every column
+    counts, including the ones that aren't used.
+    """
+    ext = os.path.splitext(decompress.strip_suffix(input_path(filename)))[1].lower()
+    if ext in RECORD_READERS:
+        # Records that can't be decoded are reported when the cards are read
+        records = RECORD_READERS[ext](filename, lambda text, error: None)
+        # Each value is stored with its key, in quotes, after a colon and a space
+        return sum(
+            len(key) + len(val) + 6
+            for record in itertools.islice(records, last_row)
+            for key, val in record.items()
+        )
+
+    reader = TABLE_READERS.get(ext, iter_csv_rows)
+    if reader is iter_csv_rows:
+        # Read from the start on one core, instead of parsing the whole file in chunks
+        with decompress.open_text(filename, errors="surrogateescape") as f:
+            table = itertools.islice(csv.reader(f), 1, last_row)
+            return sum(len(val) + 1 for row in table for val in row)
+    table = itertools.islice(reader(filename), 1, last_row)
+    return sum(len(val) + 1 for row in table for val in row)
+
+
+def estimate_workload(
+    filenames: Iterable[str], cards: Iterable[dict[str, str]]
+) -> tuple[int, float, Iterator[dict[str, str]]]:
+    """
+    Estimate how many cards the input files hold and how much text each card has, by
+    reading the first few cards. If there are more, the count is extrapolated from
+    the size of the files and how much of the first file the sample took up, rows
+    left out by the filter and unused columns included. It is only rough for
+    compressed formats like XLSX.
+    Returns the estimated count, the average characters per card, and the cards with
+    the ones read for the estimate put back in front.
+    """
+    cards = iter(cards)
+    sample = list(itertools.islice(cards, SAMPLE_SIZE))
+
+    # One extra character per field for the separator between values
+    chars = sum(len(val) + 1 for card in sample for val in card.values())
+    average = chars / len(sample) if sample else 0.0
+
+    count = len(sample)
+    if count == SAMPLE_SIZE:
+        size = sum(os.path.getsize(input_path(filename)) for filename in filenames)
+        # The input the sample was read from also holds the columns that aren't used
+        # and the rows the --where filter left out, so count those too
+        per_card = average
+        origins = [card_origin(card, ix) for ix, card in enumerate(sample, 1)]
+        if source := origins[0][0]:
+            rows = [row for card_source, row in origins if card_source == source]
+            with contextlib.suppress(*READ_ERRORS):
+                per_card = input_chars(source, rows[-1]) / len(rows)
+        count = max(count, int(size / max(per_card, 1)))
+
+    return count, average, itertools.chain(sample, cards)
+
+
+def render_seconds(average_chars: float) -> float:
+    """
+    Estimate how long rendering a card with this much text takes.
+    """
+    return RENDER_SECONDS_PER_CARD + average_chars * RENDER_SECONDS_PER_CHAR
+
+
+def read_csv(
+    filenames: Iterable[str] = (),
+    renames: dict[str, dict[str, str]] | None = None,
+    columns: Iterable[str] | None = None,
+    where: ast.expr | None = None,
+) -> list[Card]:
+    """
+    Import the cards from one or more CSV, spreadsheet or JSON files, prompting the
+    user to select files if none are given. Returns list of cards.
+    """
+    return list(iter_cards(filenames, renames, columns, where=where))
+
+
+def render_card(
+    card: Mapping[str, str], column_mapping: Mapping[str, str]
+) -> dict[str, str]:
+    """
+    Apply the formatting fixes needed to make a card MSE-compliant. Returns the MSE
+    fields that have content, in the order they are written to the card file. Neither
+    the card nor the mapping is changed, so cards can be rendered on any thread.
+    """
+    column_mapping = card_parser.planeswalker_columns(column_mapping)
+
+    # If card_type is provided, combine it with super_type
+    card = card_parser.fix_card_type(card, column_mapping)
+
+    # Set stylesheet for certain card types
+    card = card_parser.fix_stylesheet(card, column_mapping)
+
+    # Planeswalkers have their own rules box
+    card = card_parser.fix_planeswalker_rule_text(card, column_mapping)
+
+    fields = {}
+    for col in column_mapping:
+        # Some columns with need additional formatting fixes
+        if "card_type" in col:
+            continue
+        elif "rarity" in col:
+            val = card_parser.fix_rarity(card.get(column_mapping[col], ""))
+        elif "text" in col and card.get(column_mapping[col]):
+            val = card_parser.fix_multiline_text(card.get(column_mapping[col], ""))
+            val = card_parser.fix_symbols(val)
+            card_name = card.get(
+                column_mapping[f"name{'_2' if '2' in col else ''}"], ""
+            )
+            val = card_parser.fix_name_in_text(val, card_name)
+        elif "name" in col:
+            val = card_parser.fix_symbols(card.get(column_mapping[col], ""))
+            val = val.replace("\n", " ")
+        elif "stylesheet" in col and not card.get(column_mapping[col]):
+            continue
+        elif (
+            "power" in col or "toughness" in col or "loyalty" in col
+        ) and not card_parser.needs_power_toughness_loyalty(col, card, column_mapping):
+            continue
+        elif "cost" in col:
+            val = card.get(column_mapping[col], "").upper()
+        else:
+            val = card.get(column_mapping[col], "")
+        # Only write fields that have content to avoid errors
+        if val:
+            fields[col] = val
+
+    return fields
+
+
+def render_card_file(
+    item: tuple[int, Mapping[str, str]], column_mapping: Mapping[str, str], now: str
+) -> tuple[str, int, dict[str, str]]:
+    """
+    Render a card, given along with its position in the input, into the fields of its
+    card file, stamped with the time `now`. Returns the card's file name, its
+    position and the fields.
+    """
+    ix, card = item
+    filename = (
+        card_parser.fix_file_name(card.get(column_mapping["name"], ""))
+        or f"untitled {ix}"
+    )
+    fields = render_card(card, column_mapping)
+
+    # Add time the card was written
+    fields["time_created"] = fields["time_modified"] = now
+    return filename, ix, fields
+
+
+def try_render_card_file(
+    item: tuple[int, Mapping[str, str]], column_mapping: Mapping[str, str], now: str
+) -> tuple[str, int, Mapping[str, str], str]:
+    """
+    Like `render_card_file`, but also returns the error if the card fails to render,
+    or an empty string if not. A card that fails is returned with an empty file name
+    and the card itself in place of its fields, so one bad card doesn't stop the
+    others from being rendered. Only the errors in `RENDER_ERRORS` are caught, so a
+    bug still stops the run.
+    """
+    try:
+        return *render_card_file(item, column_mapping, now), ""
+    except RENDER_ERRORS as e:
+        return "", item[0], item[1], f"{type(e).__name__}: {e}"
 
 
 def process_csv(
-    set_dir: str, column_mapping: dict[str, str], cards: Iterable[dict[str, str]]
-) -> None:
+    set_dir: str,
+    column_mapping: Mapping[str, str],
+    cards: Iterable[dict[str, str]],
+    timestamp: str = "",
+    executor: str = "",
+    workers: int = 0,
+    chunk_size: int = pipeline.CHUNK_SIZE,
+    checkpoint_key: str = "",
+    on_error: ErrorHandler | None = None,
+    exports: Iterable["sinks.Sink"] = (),
+) -> int:
     """
     Given a list of cards and a mapping dictionary to translate to MSE attributes,
-    write each card to a file in the set directory.
+    write each card to a file in the set directory, and to each of the `exports`
+    too. Cards are read and rendered once however many outputs they go to. Reading,
+    rendering and writing run as separate threads connected by bounded queues, so a
+    slow disk and formatting the cards overlap instead of waiting on each other.
+    Cards are rendered by `executor` ("serial", "thread" or "process"), picked to
+    suit the interpreter if not given, in chunks of `chunk_size` cards. Every card
+    is stamped with the same time, which defaults to when the run started.
+
+    If a checkpoint key is given, progress is saved every so often, and a run
+    interrupted with the same key picks up after the last checkpoint it saved. Cards
+    that fail to render are passed to `on_error` if given, and stop the run if not.
+    Returns the number of cards in the set, counting those written before the
+    checkpoint a run resumed from.
     """
-    with open(set_dir + "/set", "a", encoding="utf8") as set_file:
-        for ix, card in enumerate(cards):
+    state = checkpoint.load(set_dir, checkpoint_key) if checkpoint_key else None
+    if state:
+        # Skip the cards that were already written, and stamp the rest the same way
+        written = checkpoint.restore(set_dir, state)
+        start, now = state["cards"], state["timestamp"]
+        cards = itertools.islice(cards, start, None)
+        print(f"Resuming after {start} cards")
+    else:
+        written, start = set(), 0
+        now = timestamp or card_parser.get_current_timestamp()
+
+    # Without a set directory, the cards only go to the exports, e.g. shards
+    exports = list(exports)
+    import sinks
+
+    outputs = [sinks.MseSink(set_dir)] if set_dir else []
+    sizes = state["export_sizes"] if state else [None] * len(exports)
+    for sink in outputs:
+        sink.open()
+    for sink, size in zip(exports, sizes):
+        sink.open(size)
+    outputs.extend(exports)
+    executor = executor or pipeline.default_executor()
+
+    # A plain dict, since the read-only mapping can't be sent to other processes
+    render = functools.partial(
+        try_render_card_file, column_mapping=dict(column_mapping), now=now
+    )
+
+    read = pipeline.iter_threaded(enumerate(cards, start))
+    rendered = pipeline.iter_threaded(
+        pipeline.map_ordered(render, read, executor, workers, chunk_size)
+    )
+
+    count = len(written)
+    try:
+        for filename, ix, fields, error in rendered:
+            if error:
+                # Report the card by where it was read from, as read errors are
+                source, row = card_origin(fields, ix + 1)
+                if on_error is None:
+                    where = f"{source} row {row}" if source else f"Card {row}"
+                    raise ValueError(f"{where} couldn't be rendered: {error}")
+                on_error("render", source, row, error, fields.values())
+                continue
+
             # Check for duplicate card names
-            filename = (
-                card_parser.fix_file_name(card.get(column_mapping["name"], ""))
-                or f"untitled {ix}"
-            )
-            if os.path.exists(f"{set_dir}/card {filename}"):
+            if filename in written:
                 filename += f" {ix}"
+            written.add(filename)
+
+            for sink in outputs:
+                sink.add(filename, fields)
+            count += 1
+
+            if checkpoint_key and (ix + 1) % checkpoint.CHECKPOINT_EVERY == 0:
+                checkpoint.save(
+                    set_dir,
+                    {
+                        "key": checkpoint_key,
+                        "cards": ix + 1,
+                        "timestamp": now,
+                        "set_size": outputs[0].tell(),
+                        "export_sizes": [sink.tell() for sink in exports],
+                    },
+                )
+    finally:
+        for sink in outputs:
+            sink.close()
+
+    return count
 
-            # Write each card to its own file
-            with open(f"{set_dir}/card {filename}", "w", encoding="utf8") as card_file:
-                card_file.write("mse_version: 2.0.0\n")
-                card_file.write("card:\n")
-
-                # If card_type is provided, combine it with super_type
-                card_parser.fix_card_type(card, column_mapping)
-
-                # Set stylesheet for certain card types
-                card_parser.fix_stylesheet(card, column_mapping)
-
-                # Planeswalkers have their own rules box
-                card_parser.fix_planeswalker_rule_text(card, column_mapping)
-
-                for col in column_mapping:
-                    # Some columns with need additional formatting fixes
-                    if "card_type" in col:
-                        continue
-                    elif "rarity" in col:
-                        val = card_parser.fix_rarity(card.get(column_mapping[col], ""))
-                    elif "text" in col and card.get(column_mapping[col]):
-                        val = card_parser.fix_multiline_text(
-                            card.get(column_mapping[col], "")
-                        )
-                        val = card_parser.fix_symbols(val)
-                        card_name = card.get(
-                            column_mapping[f"name{'_2' if '2' in col else ''}"], ""
-                        )
-                        val = card_parser.fix_name_in_text(val, card_name)
-                    elif "name" in col:
-                        val = card_parser.fix_symbols(card.get(column_mapping[col], ""))
-                        val = val.replace("\n", " ")
-                    elif "stylesheet" in col and not card.get(column_mapping[col]):
-                        continue
-                    elif (
-                        "power" in col or "toughness" in col or "loyalty" in col
-                    ) and not card_parser.needs_power_toughness_loyalty(
-                        col, card, column_mapping
-                    ):
-                        continue
-                    elif "cost" in col:
-                        val = card.get(column_mapping[col], "").upper()
-                    else:
-                        val = card.get(column_mapping[col], "")
-                    # Only write fields that have content to avoid errors
-                    if val:
-                        card_file.write(f"\t{col}: {val}\n")
-
-                # Add time the card was written
-                now = card_parser.get_current_timestamp()
-                card_file.write(f"\ttime_created: {now}\n")
-                card_file.write(f"\ttime_modified: {now}\n")
-
-            # Update the set file to include the card
-            # MSE should combine it all into one file automatically
-            set_file.write(f"include_file: card {filename}\n")
-
-
-def zip_set_dir(set_dir: str) -> None:
+
+def zip_set_dir(set_dir: str, timestamp: str = "") -> None:
     """
     Take the directory containing the set file and zip it so that MSE can open it.
+    Cards are stored in the order they were written. If a timestamp is given, every
+    file in the archive gets that time and the same metadata, so converting the same
+    input twice produces byte-identical sets.
+
+    This runs after `process_csv` instead of as its writer stage, because resuming
+    from a checkpoint cuts the set file short and deletes card files, which can't be
+    undone in an archive that is half written, and the set file only lists every
+    card once the last one is written.
     """
     set_name = set_dir.split(".mse-set")[0]
-    shutil.make_archive(set_name, "zip", set_dir)
+
+    with open(f"{set_dir}/set", "r", encoding="utf8") as f:
+        included = [
+            line.partition(":")[2].strip()
+            for line in f
+            if line.startswith("include_file:")
+        ]
+    others = sorted(set(os.listdir(set_dir)) - {"set", *included})
+
+    import zipfile
+
+    with zipfile.ZipFile(set_name + ".zip", "w", zipfile.ZIP_DEFLATED) as archive:
+        for name in ["set", *included, *others]:
+            path = os.path.join(set_dir, name)
+            if not timestamp:
+                archive.write(path, name)
+                continue
+
+            date_time = dt.datetime.strptime(timestamp, card_parser.TIMESTAMP_FORMAT)
+            info = zipfile.ZipInfo(name, date_time.timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3
+            info.external_attr = 0o644 << 16
+            with open(path, "rb") as src, archive.open(info, "w") as dst:
+                shutil.copyfileobj(src, dst)
+
     shutil.rmtree(set_dir)
     os.rename(set_name + ".zip", set_dir)
+
+
+def hash_file(filename: str) -> str:
+    """
+    Get the SHA-256 hash of a file's contents.
+    """
+    digest = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
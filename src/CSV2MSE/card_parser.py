@@ -1,11 +1,24 @@
 import datetime as dt
 import html
+import re
+from typing import Mapping
 
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+SYMBOL_TAG = re.compile(r"<sym(?:-auto)?>(.*?)</sym(?:-auto)?>")
+MARKUP_TAG = re.compile(r"</?[a-z][^<>]*>")
 
-def fix_card_type(card: dict[str, str], column_mapping: dict[str, str]) -> None:
+# Fields planeswalkers keep their rules text in, and the field it is moved from
+PLANESWALKER_TEXT = {"level_1_text": "rule_text", "level_1_text_2": "rule_text_2"}
+
+
+def fix_card_type(
+    card: Mapping[str, str], column_mapping: Mapping[str, str]
+) -> dict[str, str]:
     """
-    Combine the card type and supertype into one string.
+    Combine the card type and supertype into one string. Returns a fixed copy of the
+    card.
     """
+    card = dict(card)
     if card.get(column_mapping.get("card_type", "")):
         super_type = card.get(column_mapping.get("super_type", ""), "")
         card_type = card.get(column_mapping.get("card_type", ""), "")
@@ -18,12 +31,19 @@ def fix_card_type(card: dict[str, str], column_mapping: dict[str, str]) -> None:
             f"{super_type} {card_type}".strip()
         )
 
+    return card
+
 
-def fix_stylesheet(card: dict[str, str], column_mapping: dict[str, str]) -> None:
+def fix_stylesheet(
+    card: Mapping[str, str], column_mapping: Mapping[str, str]
+) -> dict[str, str]:
     """
     Set alternate stylesheet when easily detectable. Can handle planeswalkers, battles,
-    two-faced cards (e.g. DFCs, adventures) and tokens.
+    two-faced cards (e.g. DFCs, adventures) and tokens. Returns a fixed copy of the
+    card.
     """
+    card = dict(card)
+
     # Uses `or` instead of second parameter to `get` to replace empty string as well
     if "planeswalker" in card.get(column_mapping.get("super_type", ""), "").lower():
         card[column_mapping.get("stylesheet", "")] = (
@@ -49,30 +69,39 @@ def fix_stylesheet(card: dict[str, str], column_mapping: dict[str, str]) -> None
             card.get(column_mapping.get("stylesheet", "")) or "m15-mainframe-dfc"
         )
 
+    return card
 
-def fix_planeswalker_rule_text(
-    card: dict[str, str], column_mapping: dict[str, str]
-) -> None:
+
+def planeswalker_columns(column_mapping: Mapping[str, str]) -> dict[str, str]:
     """
-    Planeswalkers get their own field for rules text instead of `rule_text`.
+    Add the fields planeswalkers keep their rules text in to the column mapping, unless
+    the config file already maps them. Returns a new mapping.
     """
-    # Define `level_1_text`
-    column_mapping["level_1_text"] = column_mapping.get("level_1_text", "level_1_text")
-    column_mapping["level_1_text_2"] = column_mapping.get(
-        "level_1_text_2", "level_1_text_2"
-    )
+    return {
+        **column_mapping,
+        **{col: column_mapping.get(col, col) for col in PLANESWALKER_TEXT},
+    }
 
-    super_type = card.get(column_mapping.get("super_type", ""), "").lower()
-    if "planeswalker" in super_type:
-        card["level_1_text"] = card.pop(column_mapping.get("rule_text", ""), "")
 
-    super_type_2 = card.get(column_mapping.get("super_type_2", ""), "").lower()
-    if "planeswalker" in super_type_2:
-        card["level_1_text_2"] = card.pop(column_mapping.get("rule_text_2", ""), "")
+def fix_planeswalker_rule_text(
+    card: Mapping[str, str], column_mapping: Mapping[str, str]
+) -> dict[str, str]:
+    """
+    Planeswalkers get their own field for rules text instead of `rule_text`. Returns a
+    fixed copy of the card.
+    """
+    card = dict(card)
+    for col, rule_col in PLANESWALKER_TEXT.items():
+        suffix = col.removeprefix("level_1_text")
+        super_type = card.get(column_mapping.get(f"super_type{suffix}", ""), "")
+        if "planeswalker" in super_type.lower():
+            card[col] = card.pop(column_mapping.get(rule_col, ""), "")
+
+    return card
 
 
 def needs_power_toughness_loyalty(
-    col: str, card: dict[str, str], column_mapping: dict[str, str]
+    col: str, card: Mapping[str, str], column_mapping: Mapping[str, str]
 ) -> bool:
     """
     Check that only creatures have power/toughness and planeswalkers/battles have loyalty.
@@ -222,8 +251,26 @@ def fix_name_in_text(text: str, card_name: str) -> str:
     return text
 
 
+def unfix_multiline_text(text: str) -> str:
+    """
+    Undo `fix_multiline_text`, turning tab-indented MSE lines back into plain newlines.
+    """
+    if not text.startswith("\n"):
+        return text
+    return "\n".join(line.removeprefix("\t\t") for line in text.split("\n")[1:])
+
+
+def unfix_symbols(text: str) -> str:
+    """
+    Turn MSE mana symbols back into braces and strip the remaining MSE markup, such as
+    the `<atom-cardname>` tags added by `fix_name_in_text`.
+    """
+    text = SYMBOL_TAG.sub(r"{\1}", text)
+    return MARKUP_TAG.sub("", text)
+
+
 def get_current_timestamp() -> str:
     """
     Get the current time as a formatted string.
     """
-    return dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return dt.datetime.now().strftime(TIMESTAMP_FORMAT)
@@ -0,0 +1,125 @@
+from typing import Callable, Iterable, Iterator, Mapping, TypeVar
+
+import card_importer
+import card_parser
+
+T = TypeVar("T", bound=dict[str, str])
+
+# A rule looks at one card and returns a description of the problem, or ""
+Rule = Callable[[dict[str, str]], str]
+
+# The file and row of a card with a problem, and a description of the problem
+Problem = tuple[str, int, str]
+
+# Card types that keep each stat field; it is dropped from any other card
+STAT_TYPES = {
+    "power": ("creature",),
+    "toughness": ("creature",),
+    "loyalty": ("planeswalker", "battle"),
+}
+
+
+def type_getter(
+    column_mapping: Mapping[str, str], suffix: str
+) -> Callable[[dict[str, str]], str]:
+    """
+    Make a function that gets the full type line of one face of a card, combining the
+    supertype and card type the same way `fix_card_type` does.
+    """
+    columns = [
+        column_mapping[key]
+        for key in (f"super_type{suffix}", f"card_type{suffix}")
+        if key in column_mapping
+    ]
+    return lambda card: " ".join(card.get(col, "") for col in columns).lower()
+
+
+def compile_rules(column_mapping: Mapping[str, str]) -> list[Rule]:
+    """
+    Build the checks for every mapped field that the conversion would otherwise drop or
+    change without saying so. The mapping is only looked at once, so checking each
+    card is just a few dictionary lookups.
+    """
+    rules: list[Rule] = []
+
+    if name_col := column_mapping.get("name"):
+        rules.append(lambda card: "" if card.get(name_col) else "missing name")
+
+    for col, key in column_mapping.items():
+        if "rarity" in col:
+
+            def check_rarity(card: dict[str, str], col=col, key=key) -> str:
+                rarity = card.get(key, "")
+                if rarity and not card_parser.fix_rarity(rarity):
+                    return f"unknown {col} {rarity!r}"
+                return ""
+
+            rules.append(check_rarity)
+
+        stat, _, suffix = col.partition("_")
+        if stat in STAT_TYPES and suffix in ("", "2"):
+            get_type = type_getter(column_mapping, f"_{suffix}" if suffix else "")
+
+            def check_stat(
+                card: dict[str, str],
+                col=col,
+                key=key,
+                get_type=get_type,
+                types=STAT_TYPES[stat],
+            ) -> str:
+                value = card.get(key, "")
+                if value and not any(t in get_type(card) for t in types):
+                    kinds = " or ".join(types)
+                    return f"{col} {value!r} is dropped since the card isn't a {kinds}"
+                return ""
+
+            rules.append(check_stat)
+
+    return rules
+
+
+def check_cards(
+    cards: Iterable[T],
+    column_mapping: Mapping[str, str],
+    problems: list[Problem],
+) -> Iterator[T]:
+    """
+    Pass the cards through unchanged, adding any problems found to `problems` as the
+    file and row the card was read from, and a description. Works as a stage in front
+    of `process_csv`, so checking costs no extra pass over the input.
+    """
+    rules = compile_rules(column_mapping)
+    name_col = column_mapping.get("name", "")
+
+    for index, card in enumerate(cards, 1):
+        for rule in rules:
+            if message := rule(card):
+                name = card.get(name_col, "")
+                source, row = card_importer.card_origin(card, index)
+                problems.append(
+                    (source, row, f"{name}: {message}" if name else message)
+                )
+        yield card
+
+
+def validate(
+    cards: Iterable[dict[str, str]], column_mapping: Mapping[str, str]
+) -> list[Problem]:
+    """
+    Check every card in one pass without converting anything. Returns the problems
+    found as the file, row and description of each.
+    """
+    problems: list[Problem] = []
+    for _ in check_cards(cards, column_mapping, problems):
+        pass
+    return problems
+
+
+def print_problems(problems: list[Problem]) -> None:
+    """
+    Print the problems found, one per line.
+    """
+    for source, row, message in problems:
+        print(f"{source} row {row}: {message}" if source else f"Row {row}: {message}")
+    if problems:
+        print(f"{len(problems)} problems found")
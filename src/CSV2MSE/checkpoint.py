@@ -0,0 +1,67 @@
+import json
+import os
+from typing import Any
+
+# Kept in the set directory while it is being written, and removed before zipping it
+CHECKPOINT_FILE = "checkpoint.json"
+
+# Cards written between checkpoints
+CHECKPOINT_EVERY = 1000
+
+
+def load(set_dir: str, key: str) -> dict[str, Any] | None:
+    """
+    Read the checkpoint left in a set directory by an unfinished run. Returns None if
+    there isn't one, or if it was made from different input files or config.
+    """
+    path = os.path.join(set_dir, CHECKPOINT_FILE)
+    if not os.path.isfile(path):
+        return None
+
+    with open(path, "r", encoding="utf8") as f:
+        state = json.load(f)
+    return state if state.get("key") == key else None
+
+
+def save(set_dir: str, state: dict[str, Any]) -> None:
+    """
+    Record how far a run has got. The checkpoint is replaced in one step, so a run
+    that is interrupted while saving still leaves the previous checkpoint behind.
+    """
+    path = os.path.join(set_dir, CHECKPOINT_FILE)
+    with open(path + ".tmp", "w", encoding="utf8") as f:
+        json.dump(state, f)
+    os.replace(path + ".tmp", path)
+
+
+def restore(set_dir: str, state: dict[str, Any]) -> set[str]:
+    """
+    Put a set directory back the way it was when the checkpoint was saved: cards
+    included in the set file after it are dropped, along with their card files.
+    Returns the names of the card files that were already written.
+    """
+    set_path = os.path.join(set_dir, "set")
+    os.truncate(set_path, state["set_size"])
+
+    with open(set_path, "r", encoding="utf8") as f:
+        written = {
+            line.partition(":")[2].strip().removeprefix("card ")
+            for line in f
+            if line.startswith("include_file:")
+        }
+
+    for name in os.listdir(set_dir):
+        if name.startswith("card ") and name.removeprefix("card ") not in written:
+            os.remove(os.path.join(set_dir, name))
+
+    return written
+
+
+def clear(set_dir: str) -> None:
+    """
+    Remove the checkpoint once a run has finished.
+    """
+    for name in [CHECKPOINT_FILE, CHECKPOINT_FILE + ".tmp"]:
+        path = os.path.join(set_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
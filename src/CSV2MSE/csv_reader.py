@@ -0,0 +1,103 @@
+import csv
+import functools
+import io
+import mmap
+from typing import Iterator
+
+import pipeline
+
+# Bytes of the file each worker parses at a time
+CHUNK_BYTES = 16 * 2**20
+
+# Put after a chunk to check that it ends where a record does. If the chunk ends
+# inside a quoted cell, this ends up in that cell instead of a row of its own.
+END_OF_CHUNK = "\ufdd0"
+
+
+def find_record_boundaries(
+    data: bytes | mmap.mmap, chunk_bytes: int = CHUNK_BYTES
+) -> list[int]:
+    """
+    Find offsets roughly `chunk_bytes` apart where a new CSV record starts, so the
+    chunks between them can be parsed on their own. Cells in quotes can contain
+    newlines, so a newline only ends a record if an even number of quotes come before
+    it; escaped quotes are doubled and don't change the count. This assumes quotes only
+    appear in quoted cells, as spreadsheets and the csv module write them, which
+    `read_chunk` checks. Returns the offsets, starting with 0 and ending with the
+    length of the data.
+    """
+    boundaries = [0]
+    quotes = 0
+    pos = 0
+    while (target := boundaries[-1] + chunk_bytes) < len(data):
+        # Searching and counting is done in C, so this is fast even on large files
+        end = target
+        while (end := data.find(b"\n", end)) != -1:
+            end += 1
+            quotes += data[pos:end].count(b'"')
+            pos = end
+            if quotes % 2 == 0:
+                break
+        if end == -1 or end == len(data):
+            break
+        boundaries.append(end)
+    boundaries.append(len(data))
+    return boundaries
+
+
+def read_chunk(filename: str, span: tuple[int, int]) -> list[list[str]] | None:
+    """
+    Parse the CSV records between two record boundaries of a file. Bytes that aren't
+    valid UTF-8 are kept as surrogate characters, as `iter_csv_rows` does. Returns
+    None if the chunk doesn't end where a record does, which means a quote in an
+    unquoted cell threw off `find_record_boundaries`.
+    """
+    start, end = span
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            text = data[start:end].decode("utf8", "surrogateescape")
+    # The last chunk of a file may not end in a newline, but nothing comes after it
+    if not text.endswith("\n"):
+        return list(csv.reader(io.StringIO(text, newline=None)))
+
+    # Translate line endings the same way opening the file in text mode does
+    rows = list(csv.reader(io.StringIO(text + END_OF_CHUNK, newline=None)))
+    if rows.pop() != [END_OF_CHUNK]:
+        return None
+    return rows
+
+
+def iter_rows_from(filename: str, start: int) -> Iterator[list[str]]:
+    """
+    Stream the rows of a CSV file from a record boundary onwards, on one core.
+    """
+    with open(filename, "rb") as f:
+        f.seek(start)
+        text = io.TextIOWrapper(f, encoding="utf8", errors="surrogateescape")
+        yield from csv.reader(text)
+
+
+def iter_rows_parallel(
+    filename: str, executor: str, workers: int = 0, chunk_bytes: int = CHUNK_BYTES
+) -> Iterator[list[str]]:
+    """
+    Stream the rows of a large CSV file, parsing chunks of it on several workers at
+    once. The file is memory-mapped to find where the chunks start, and rows are
+    passed on in their original order. If a chunk turns out not to end where a
+    record does, the rest of the file is read on one core from where it starts.
+    """
+    with open(filename, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            boundaries = find_record_boundaries(data, chunk_bytes)
+
+    spans = list(zip(boundaries, boundaries[1:]))
+    read = functools.partial(read_chunk, filename)
+    chunks = pipeline.map_ordered(read, spans, executor, workers, chunk_size=1)
+    for (start, _), rows in zip(spans, chunks):
+        if rows is None:
+            # Every chunk before this one ended where a record does, so this one
+            # starts where one does
+            chunks.close()
+            yield from iter_rows_from(filename, start)
+            return
+        yield from rows
@@ -0,0 +1,111 @@
+import contextlib
+import importlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+
+import daemon_client
+import main
+
+# Modules the different modes import on first use, loaded up front instead
+WARM_MODULES = [
+    "card_exporter",
+    "result_cache",
+    "scryfall_importer",
+    "set_diff",
+    "set_updater",
+]
+
+
+def run_job(argv: list[str], cwd: str) -> dict:
+    """
+    Run `main.py` with the given arguments from the client's working directory,
+    capturing everything it prints. Returns whether the job succeeded and its output.
+    """
+    output = io.StringIO()
+    ok = True
+    old_cwd = os.getcwd()
+    try:
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            args = main.parse_args(argv)
+            if args.mode == "serve":
+                raise ValueError("The server can't start another server")
+            if not args.config or not args.input:
+                raise ValueError("Jobs need --config and --input to avoid pop-ups")
+            os.chdir(cwd or old_cwd)
+            main.run(args)
+    except SystemExit as e:
+        # Raised by argparse for --help and invalid arguments
+        ok = not e.code
+    except Exception as e:
+        output.write(f"{e}\n")
+        ok = False
+    finally:
+        os.chdir(old_cwd)
+
+    return {"ok": ok, "output": output.getvalue()}
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """
+    Handles one job per connection. The client sends a line of JSON with its command
+    line arguments and working directory, and gets a line of JSON back.
+    """
+
+    def handle(self) -> None:
+        # Connections that send nothing are just checking the server is up
+        if not (line := self.rfile.readline()):
+            return
+        job = json.loads(line)
+        reply = run_job(job.get("argv", []), job.get("cwd", ""))
+        self.wfile.write(json.dumps(reply).encode("utf8") + b"\n")
+
+
+def serve(socket_path: str) -> None:
+    """
+    Listen for conversion jobs on a Unix socket until interrupted. Keeping one process
+    running means each job skips starting Python and importing the converter, which
+    is most of the time spent on small sets. Jobs run one at a time, since each one
+    runs from its client's working directory.
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        raise OSError("The server needs Unix sockets, which this system doesn't have")
+
+    if os.path.dirname(socket_path) == daemon_client.SOCKET_DIR:
+        os.makedirs(daemon_client.SOCKET_DIR, mode=0o700, exist_ok=True)
+    daemon_client.check_socket(socket_path)
+
+    if os.path.exists(socket_path):
+        # Only clean up the socket if no server is using it any more
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(socket_path)
+            except OSError:
+                os.remove(socket_path)
+            else:
+                raise OSError(f"A server is already listening on {socket_path}")
+
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+    # Jobs can't answer prompts, so make them fail instead of waiting forever
+    sys.stdin = io.StringIO()
+
+    # Only the user running the server may send it jobs
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, JobHandler)
+    finally:
+        os.umask(old_umask)
+
+    print(f"Listening on {socket_path}")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.remove(socket_path)
@@ -0,0 +1,76 @@
+"""
+Send a conversion job to a server started with `main.py serve` and print its output.
+Takes the same arguments as `main.py`, except that files can't be picked with pop-ups:
+
+    python daemon_client.py [--socket PATH] -- --config metadata.cfg --input cards.csv
+
+Kept to the standard library's socket and json modules so it starts quickly.
+"""
+
+import json
+import os
+import socket
+import sys
+import tempfile
+
+# Where the socket goes by default: the user's runtime directory if there is one, or
+# a directory of the user's own in the temp directory, so other users can't take the
+# name first
+if os.environ.get("XDG_RUNTIME_DIR"):
+    SOCKET_DIR = os.environ["XDG_RUNTIME_DIR"]
+elif hasattr(os, "getuid"):
+    SOCKET_DIR = os.path.join(tempfile.gettempdir(), f"csv2mse-{os.getuid()}")
+else:
+    # Windows gives each user their own temp directory
+    SOCKET_DIR = os.path.join(tempfile.gettempdir(), "csv2mse")
+DEFAULT_SOCKET = os.path.join(SOCKET_DIR, "csv2mse.sock")
+
+
+def check_socket(socket_path: str) -> None:
+    """
+    Make sure a socket, and the default socket directory if it's in there, belong to
+    the current user and the directory is private, so another user can't stand in
+    for the server or read the jobs sent to it. Paths that don't exist yet pass.
+    """
+    if not hasattr(os, "getuid"):
+        return
+
+    paths = [socket_path]
+    if os.path.dirname(socket_path) == SOCKET_DIR:
+        paths.append(SOCKET_DIR)
+    for path in paths:
+        try:
+            stat = os.lstat(path)
+        except FileNotFoundError:
+            continue
+        if stat.st_uid != os.getuid():
+            raise OSError(f"{path} belongs to another user")
+        if path == SOCKET_DIR and stat.st_mode & 0o077:
+            raise OSError(f"{path} can be used by other users")
+
+
+def submit(argv: list[str], socket_path: str = DEFAULT_SOCKET) -> dict:
+    """
+    Run `main.py` with the given arguments on the server, from the current directory.
+    Returns the server's reply, with whether the job succeeded and what it printed.
+    """
+    check_socket(socket_path)
+    job = {"argv": argv, "cwd": os.getcwd()}
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(job).encode("utf8") + b"\n")
+        with sock.makefile("rb") as f:
+            return json.loads(f.readline())
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    socket_path = DEFAULT_SOCKET
+    if argv[:1] == ["--socket"]:
+        socket_path, argv = argv[1], argv[2:]
+    if argv[:1] == ["--"]:
+        argv = argv[1:]
+
+    reply = submit(argv, socket_path)
+    sys.stdout.write(reply["output"])
+    sys.exit(0 if reply["ok"] else 1)
@@ -0,0 +1,90 @@
+import io
+import os
+from typing import IO
+
+# How each compression format's files start
+MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+# File extensions of compressed files, which hide the extension of the file inside
+SUFFIXES = [".gz", ".bz2", ".xz", ".zst"]
+
+
+def detect_compression(filename: str) -> str:
+    """
+    Find out how a file is compressed from its first few bytes, whatever its name.
+    Returns the name of the format, or an empty string if it isn't compressed.
+    """
+    with open(filename, "rb") as f:
+        start = f.read(max(len(magic) for magic in MAGIC_BYTES.values()))
+    for name, magic in MAGIC_BYTES.items():
+        if start.startswith(magic):
+            return name
+    return ""
+
+
+def strip_suffix(filename: str) -> str:
+    """
+    Remove a compression extension from a file name, e.g. `cards.json.gz` becomes
+    `cards.json`, so the reader can be picked by the extension that's left.
+    """
+    root, ext = os.path.splitext(filename)
+    return root if ext.lower() in SUFFIXES else filename
+
+
+def open_zstd(filename: str) -> IO[bytes]:
+    """
+    Open a Zstandard file, using the standard library on Python 3.14 and later, and
+    the zstandard package otherwise.
+    """
+    try:
+        from compression import zstd
+
+        return zstd.open(filename, "rb")
+    except ImportError:
+        pass
+
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            f"Reading {filename} needs the zstandard package: pip install zstandard"
+        ) from None
+    f = open(filename, "rb")
+    return zstandard.ZstdDecompressor().stream_reader(f, closefd=True)
+
+
+def open_binary(filename: str) -> IO[bytes]:
+    """
+    Open a file for reading, decompressing it on the fly if it is compressed with
+    gzip, bzip2, xz or Zstandard. Nothing is decompressed to disk.
+    """
+    # The decompressors are only imported for the files that need them
+    compression = detect_compression(filename)
+    if compression == "gzip":
+        import gzip
+
+        return gzip.open(filename, "rb")
+    elif compression == "bz2":
+        import bz2
+
+        return bz2.open(filename, "rb")
+    elif compression == "xz":
+        import lzma
+
+        return lzma.open(filename, "rb")
+    elif compression == "zstd":
+        return open_zstd(filename)
+    return open(filename, "rb")
+
+
+def open_text(filename: str, encoding: str = "utf8", errors: str = "strict") -> IO[str]:
+    """
+    Open a text file that may be compressed, translating line endings the same way
+    opening it with `open` does.
+    """
+    return io.TextIOWrapper(open_binary(filename), encoding=encoding, errors=errors)
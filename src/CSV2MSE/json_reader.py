@@ -0,0 +1,104 @@
+import json
+from typing import IO, Any, Callable, Iterator
+
+import decompress
+
+CHUNK_SIZE = 1 << 16
+
+
+def flatten_record(value: Any, prefix: str = "") -> dict[str, str]:
+    """
+    Flatten a nested JSON record into one level, joining keys with dots so they can be
+    used as column names. For example, the second face of `{"faces": [{...}, {...}]}`
+    becomes `faces.1.name`, `faces.1.text`, and so on.
+    """
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    elif value is None:
+        return {prefix: ""}
+    elif isinstance(value, bool):
+        return {prefix: "true" if value else "false"}
+    else:
+        return {prefix: str(value).strip()}
+
+    record = {}
+    for key, val in items:
+        key = str(key).strip().lower()
+        record.update(flatten_record(val, f"{prefix}.{key}" if prefix else key))
+    return record
+
+
+def iter_json_values(
+    f: IO[str],
+    chunk_size: int = CHUNK_SIZE,
+    on_error: Callable[[str, str], None] | None = None,
+) -> Iterator[Any]:
+    """
+    Incrementally decode a stream of JSON values. A top-level array is unpacked into
+    its elements, so both `[{...}, {...}]` and one value after another (NDJSON) are
+    read one value at a time without loading the whole file. If `on_error` is given,
+    a line of NDJSON that can't be decoded is passed to it with the error, and
+    reading carries on from the next line.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    in_array = None
+
+    while True:
+        # Skip whitespace, and the commas between array elements
+        while pos < len(buffer) and (
+            buffer[pos].isspace() or (in_array and buffer[pos] == ",")
+        ):
+            pos += 1
+
+        if pos < len(buffer):
+            if in_array is None:
+                in_array = buffer[pos] == "["
+                if in_array:
+                    pos += 1
+                continue
+            if in_array and buffer[pos] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                # Reading more can only help if the error is on the last line, which
+                # may not have been read in full
+                if eof or e.pos <= buffer.rfind("\n"):
+                    if in_array or on_error is None:
+                        raise
+                    end = buffer.find("\n", pos)
+                    end = len(buffer) if end == -1 else end
+                    on_error(buffer[pos:end], f"{type(e).__name__}: {e.msg}")
+                    pos = end
+                    continue
+            else:
+                # A number at the end of the buffer may carry on in the next chunk
+                if end < len(buffer) or eof:
+                    pos = end
+                    yield value
+                    continue
+        elif eof:
+            if in_array:
+                raise ValueError("Unexpected end of file inside JSON array")
+            return
+
+        # Read more, growing the read size so a huge value isn't re-parsed many times
+        buffer = buffer[pos:]
+        chunk = f.read(max(chunk_size, len(buffer)))
+        buffer, pos, eof = buffer + chunk, 0, not chunk
+
+
+def iter_json_records(
+    filename: str, on_error: Callable[[str, str], None] | None = None
+) -> Iterator[dict[str, str]]:
+    """
+    Stream the records of a JSON array or NDJSON file, which may be compressed, as
+    flattened dictionaries. Lines of NDJSON that can't be decoded are passed to
+    `on_error` if given, with the error.
+    """
+    with decompress.open_text(filename, "utf-8-sig") as f:
+        for value in iter_json_values(f, on_error=on_error):
+            yield flatten_record(value)
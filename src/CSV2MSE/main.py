@@ -1,14 +1,524 @@
+import argparse
+import ast
+import datetime as dt
+import os
+import shutil
+import sys
+from typing import TYPE_CHECKING, Iterable, Mapping, NamedTuple
+
 import card_importer
+import card_parser
+import card_validator
+import checkpoint
+import pipeline
+import quarantine
+import row_filter
 
-if __name__ == "__main__":
+if TYPE_CHECKING:
+    import shards
+
+
+class RenderPlan(NamedTuple):
+    """
+    How to render the cards: the executor, the number of workers and the chunk size.
+    """
+
+    executor: str
+    workers: int
+    chunk_size: int
+
+
+def timestamp(value: str) -> str:
+    """
+    Check that a timestamp given on the command line is in the format MSE uses.
+    """
+    if not value:
+        return value
+    try:
+        dt.datetime.strptime(value, card_parser.TIMESTAMP_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected YYYY-MM-DD HH:MM:SS")
+    return value
+
+
+def where(value: str) -> str:
+    """
+    Check that a --where filter only uses what filters are allowed to.
+    """
+    if not value:
+        return value
     try:
-        metadata, columns = card_importer.read_config_file()
-        if set_dir := card_importer.create_set_dir(metadata):
-            card_list = card_importer.read_csv()
-            card_importer.process_csv(set_dir, columns, card_list)
-            card_importer.zip_set_dir(set_dir)
+        row_filter.parse_filter(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def export(value: str) -> str:
+    """
+    Check that an extra output is in a format that can be written.
+    """
+    import sinks
+
+    if os.path.splitext(value)[1].lower() not in sinks.EXPORT_FORMATS:
+        formats = ", ".join(sinks.EXPORT_FORMATS)
+        raise argparse.ArgumentTypeError(f"expected a file ending in {formats}")
+    return value
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """
+    Read the command line options. Any file that isn't given is asked for with a pop-up.
+    """
+    parser = argparse.ArgumentParser(description="Generic CSV to MSE importer")
+    parser.add_argument(
+        "mode",
+        nargs="?",
+        choices=["csv2mse", "mse2csv", "diff", "update", "scryfall", "serve"],
+        default="csv2mse",
+        help="convert a CSV into a set (default), a set back into a CSV, show what "
+        "converting the CSV would change in an existing set, update the cards of an "
+        "existing set in place, convert Scryfall bulk data into a set, or run a "
+        "background server that converts jobs sent with daemon_client.py",
+    )
+    parser.add_argument("--config", default="", help="metadata config file")
+    parser.add_argument(
+        "--input",
+        nargs="*",
+        default=[],
+        help="input files or glob patterns, or the .mse-set to read for mse2csv",
+    )
+    parser.add_argument("--output", default="", help="CSV file to write for mse2csv")
+    parser.add_argument(
+        "--export",
+        nargs="*",
+        type=export,
+        default=[],
+        help="also write the cards to these files while making the set: .xml for a "
+        "Cockatrice card database, .ndjson or .jsonl for one JSON card per line",
+    )
+    parser.add_argument(
+        "--set", default="", help="existing .mse-set to use for diff and update"
+    )
+    parser.add_argument(
+        "--set-code",
+        nargs="*",
+        default=[],
+        help="only import cards from these sets from Scryfall bulk data",
+    )
+    parser.add_argument(
+        "--timestamp",
+        type=timestamp,
+        default="",
+        help="creation time to give every card, as YYYY-MM-DD HH:MM:SS, so repeated "
+        "runs produce the same output (defaults to the current time)",
+    )
+    parser.add_argument(
+        "--deterministic",
+        action="store_true",
+        help="produce byte-identical sets for the same input, using --timestamp or "
+        "SOURCE_DATE_EPOCH as the time for every card and file in the set",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default="",
+        help="reuse the set from an earlier run if the input files, config and "
+        "converter version haven't changed",
+    )
+    parser.add_argument(
+        "--cache-max-size",
+        type=float,
+        default=1024,
+        help="megabytes the cache may use before old sets are removed (default 1024)",
+    )
+    parser.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=30,
+        help="days after which unused cached sets are removed (default 30)",
+    )
+    parser.add_argument(
+        "--yes", action="store_true", help="overwrite an existing set without asking"
+    )
+    parser.add_argument(
+        "--executor",
+        choices=["auto", "serial", "thread", "process"],
+        default="auto",
+        help="how to spread rendering the cards over the CPU cores (default: picked "
+        "from the size of the input)",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="number of threads or processes to render with (default: one per core)",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="save progress while converting, and pick up where an interrupted run "
+        "left off",
+    )
+    parser.add_argument(
+        "--quarantine",
+        default="",
+        help="CSV file to write rows that can't be converted to (default: the set "
+        "title followed by .quarantine.csv)",
+    )
+    parser.add_argument(
+        "--strict",
+        action="store_true",
+        help="check every card first and stop without writing anything if any "
+        "problems are found",
+    )
+    parser.add_argument(
+        "--shard-cards",
+        type=int,
+        default=0,
+        help="split the set into several .mse-set files of at most this many cards",
+    )
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=0,
+        help="split the set into several .mse-set files of at most this many "
+        "megabytes of card files each, before compression",
+    )
+    parser.add_argument(
+        "--shard-by",
+        default="",
+        help="split the set into one .mse-set file for each value of this field or "
+        "column, e.g. rarity",
+    )
+    parser.add_argument(
+        "--where",
+        type=where,
+        default="",
+        help="only convert the cards matching a filter, e.g. "
+        "'rarity == \"rare\" and power >= 3'",
+    )
+    parser.add_argument(
+        "--socket",
+        default="",
+        help="Unix socket the server listens on (default: csv2mse.sock in "
+        "$XDG_RUNTIME_DIR, or in a private directory in the temp directory)",
+    )
+    args = parser.parse_args(argv)
+    if args.checkpoint and (args.shard_cards or args.shard_size or args.shard_by):
+        parser.error("--checkpoint can't be used when splitting the set into shards")
+    return args
+
+
+def build_timestamp(args: argparse.Namespace) -> str:
+    """
+    Pick the time to stamp the set with. Deterministic builds fall back to the
+    SOURCE_DATE_EPOCH convention, or the earliest time a zip file can store.
+    """
+    if args.timestamp or not args.deterministic:
+        return args.timestamp
+    if epoch := os.environ.get("SOURCE_DATE_EPOCH"):
+        date_time = dt.datetime.fromtimestamp(int(epoch), dt.timezone.utc)
+        return date_time.strftime(card_parser.TIMESTAMP_FORMAT)
+    return "1980-01-01 00:00:00"
+
+
+def finish_set(set_dir: str, timestamp: str, deterministic: bool) -> None:
+    card_importer.zip_set_dir(set_dir, timestamp if deterministic else "")
+    if deterministic:
+        print(f"{set_dir} sha256: {card_importer.hash_file(set_dir)}")
+
+
+def plan_rendering(
+    args: argparse.Namespace, filenames: list[str], cards: Iterable[dict[str, str]]
+) -> tuple[Iterable[dict[str, str]], RenderPlan]:
+    """
+    Pick how to render the cards, unless --executor says so. Small sets are rendered
+    serially, since starting workers would take longer than the work itself. Returns
+    the cards, since counting them may have read some already, and the plan.
+    """
+    if args.executor != "auto":
+        return cards, RenderPlan(args.executor, args.workers, pipeline.CHUNK_SIZE)
+
+    count, average, cards = card_importer.estimate_workload(filenames, cards)
+    seconds = card_importer.render_seconds(average)
+    executor, workers, chunk_size, reason = pipeline.plan_executor(
+        count, seconds, args.workers
+    )
+    print(f"Rendering about {count} cards of {average:.0f} characters {reason}")
+    return cards, RenderPlan(executor, workers, chunk_size)
+
+
+def parse_where(
+    args: argparse.Namespace, columns: Mapping[str, str]
+) -> ast.expr | None:
+    """
+    Compile the --where filter once, letting it use MSE field names as well as column
+    names. Returns None if there isn't one.
+    """
+    return row_filter.parse_filter(args.where, columns) if args.where else None
+
+
+def make_shards(
+    args: argparse.Namespace,
+    metadata: dict[str, str],
+    columns: Mapping[str, str],
+    timestamp: str,
+) -> "shards.ShardSink | None":
+    """
+    Set up splitting the set into several .mse-set files, if any of the --shard
+    options are given. Returns None if not.
+    """
+    if not (args.shard_cards or args.shard_size or args.shard_by):
+        return None
+    import shards
+
+    # Cards are split by their rendered fields, so the field has to be in the config
+    # file. It can be given by its column name too.
+    fields = {col.lower(): field for field, col in columns.items()}
+    field = args.shard_by.strip().lower()
+    field = fields.get(field, field)
+    if field and field not in columns:
+        sys.exit(f"Can't split by {args.shard_by!r}, it isn't in the config file")
+    elif "card_type" in field:
+        # Rendering combines the card type into the super type
+        sys.exit(f"Can't split by {args.shard_by!r}, split by super_type instead")
+
+    return shards.ShardSink(
+        metadata,
+        args.shard_cards,
+        args.shard_size * 2**20,
+        field,
+        timestamp if args.deterministic else "",
+        args.yes,
+    )
+
+
+def finish_shards(shard_sink: "shards.ShardSink", deterministic: bool) -> None:
+    for set_dir in shard_sink.shards:
+        if deterministic:
+            print(f"{set_dir} sha256: {card_importer.hash_file(set_dir)}")
+        else:
+            print(f"Wrote {set_dir}")
+
+
+def evict_cache(args: argparse.Namespace) -> None:
+    import result_cache
+
+    max_bytes = args.cache_max_size * 2**20
+    max_age = args.cache_max_age * 24 * 60 * 60
+    result_cache.evict(args.cache_dir, max_bytes, max_age)
+
+
+def csv2mse(args: argparse.Namespace) -> None:
+    metadata, columns, renames = card_importer.read_config_file(args.config)
+    filenames = card_importer.expand_inputs(args.input) or card_importer.select_files(
+        "Select csv files:"
+    )
+    timestamp = build_timestamp(args)
+    where = parse_where(args, columns)
+    shard_sink = make_shards(args, metadata, columns, timestamp)
+
+    if args.strict:
+        cards = card_importer.iter_cards(
+            filenames, renames, columns.values(), where=where
+        )
+        if found := card_validator.validate(cards, columns):
+            card_validator.print_problems(found)
+            print("Aborting.")
+            return
+
+    key = ""
+    set_dir = metadata["title"] + ".mse-set"
+    if args.cache_dir or args.checkpoint:
+        # Modules only some runs need are imported when used, to keep startup fast
+        import result_cache
+
+        config = [metadata, dict(columns), renames]
+        options = [timestamp, args.deterministic, args.where, args.export]
+        if shard_sink:
+            options.append([args.shard_cards, args.shard_size, args.shard_by])
+        key = result_cache.cache_key(filenames, config, options)
+
+    # Only a single set is cached, so the exports have to be written again
+    if (
+        args.cache_dir
+        and not (args.export or shard_sink)
+        and (cached := result_cache.lookup(args.cache_dir, key))
+    ):
+        if card_importer.confirm_overwrite(set_dir, args.yes):
+            shutil.copyfile(cached, set_dir)
+            print(f"Reused cached set for {set_dir}")
+        evict_cache(args)
+        return
+
+    # Pick up an interrupted run where it left off instead of starting over
+    resuming = bool(args.checkpoint and checkpoint.load(set_dir, key))
+    if shard_sink:
+        # Each shard makes its own set directory
+        set_dir = ""
+    elif not resuming:
+        set_dir = card_importer.create_set_dir(metadata, args.yes)
+
+    if set_dir or shard_sink:
+        import sinks
+
+        exports = [shard_sink] if shard_sink else []
+        exports += [sinks.open_export(name, metadata) for name in args.export]
+        problems: list[card_validator.Problem] = []
+        quarantine_path = args.quarantine or metadata["title"] + ".quarantine.csv"
+        # A resumed run adds to the rows quarantined before it was interrupted
+        if not (args.quarantine or resuming):
+            quarantine.remove_stale(quarantine_path)
+        with quarantine.Quarantine(quarantine_path, resuming) as bad_rows:
+            cards = card_importer.iter_cards(
+                filenames, renames, columns.values(), bad_rows.add, where
+            )
+            cards = card_validator.check_cards(cards, columns, problems)
+            cards, plan = plan_rendering(args, filenames, cards)
+            count = card_importer.process_csv(
+                set_dir,
+                columns,
+                cards,
+                timestamp,
+                executor=plan.executor,
+                workers=plan.workers,
+                chunk_size=plan.chunk_size,
+                checkpoint_key=key if args.checkpoint else "",
+                on_error=bad_rows.add,
+                exports=exports,
+            )
+        if shard_sink:
+            finish_shards(shard_sink, args.deterministic)
         else:
-            input("Press enter key to quit")
+            checkpoint.clear(set_dir)
+            finish_set(set_dir, timestamp, args.deterministic)
+        card_validator.print_problems(problems)
+        if bad_rows.counts:
+            print(f"Converted {count} cards")
+            print(bad_rows.summary())
+        if args.cache_dir and set_dir:
+            result_cache.store(args.cache_dir, key, set_dir)
+            evict_cache(args)
+    else:
+        input("Press enter key to quit")
+
+
+def mse2csv(args: argparse.Namespace) -> None:
+    import card_exporter
+
+    _, columns, _ = card_importer.read_config_file(args.config)
+    set_path = "".join(args.input[:1]) or card_importer.select_file(
+        "Select .mse-set file:"
+    )
+    filename = args.output or set_path.split(".mse-set")[0] + ".csv"
+    count = card_exporter.export_set(set_path, filename, columns)
+    print(f"Wrote {count} cards to {filename}")
+
+
+def diff(args: argparse.Namespace) -> None:
+    import set_diff
+
+    metadata, columns, renames = card_importer.read_config_file(args.config)
+    set_path = args.set or metadata["title"] + ".mse-set"
+    card_list = card_importer.read_csv(
+        args.input, renames, columns.values(), parse_where(args, columns)
+    )
+    set_diff.print_diff(*set_diff.diff_set(set_path, columns, card_list))
+
+
+def update(args: argparse.Namespace) -> None:
+    import set_updater
+
+    metadata, columns, renames = card_importer.read_config_file(args.config)
+    set_path = args.set or metadata["title"] + ".mse-set"
+    card_list = card_importer.read_csv(
+        args.input, renames, columns.values(), parse_where(args, columns)
+    )
+    problems = card_validator.validate(card_list, columns)
+    card_validator.print_problems(problems)
+    if problems and args.strict:
+        print("Aborting.")
+        return
+    replaced, added = set_updater.update_set(
+        set_path, columns, card_list, args.timestamp
+    )
+    print(f"Replaced {replaced} cards and added {added} cards in {set_path}")
+
+
+def scryfall(args: argparse.Namespace) -> None:
+    import scryfall_importer
+
+    metadata, columns, _ = card_importer.read_config_file(args.config)
+    filenames = card_importer.expand_inputs(args.input) or card_importer.select_files(
+        "Select Scryfall bulk data files:"
+    )
+    # Scryfall cards already use the MSE field names
+    fields = {col: col for col in columns}
+    timestamp = build_timestamp(args)
+    shard_sink = make_shards(args, metadata, fields, timestamp)
+    set_dir = "" if shard_sink else card_importer.create_set_dir(metadata, args.yes)
+    if set_dir or shard_sink:
+        cards = scryfall_importer.iter_scryfall_cards(filenames, args.set_code)
+        if args.where:
+            keep = row_filter.compile_filter(
+                parse_where(args, fields),
+                lambda name: lambda card: card.get(name, ""),
+            )
+            cards = filter(keep, cards)
+        cards, plan = plan_rendering(args, filenames, cards)
+        import sinks
+
+        exports = [shard_sink] if shard_sink else []
+        exports += [sinks.open_export(name, metadata) for name in args.export]
+        card_importer.process_csv(
+            set_dir,
+            fields,
+            cards,
+            timestamp,
+            executor=plan.executor,
+            workers=plan.workers,
+            chunk_size=plan.chunk_size,
+            exports=exports,
+        )
+        if shard_sink:
+            finish_shards(shard_sink, args.deterministic)
+        else:
+            finish_set(set_dir, timestamp, args.deterministic)
+    else:
+        input("Press enter key to quit")
+
+
+def serve(args: argparse.Namespace) -> None:
+    import daemon
+    import daemon_client
+
+    daemon.serve(args.socket or daemon_client.DEFAULT_SOCKET)
+
+
+def run(args: argparse.Namespace) -> None:
+    if args.mode == "mse2csv":
+        mse2csv(args)
+    elif args.mode == "diff":
+        diff(args)
+    elif args.mode == "update":
+        update(args)
+    elif args.mode == "scryfall":
+        scryfall(args)
+    elif args.mode == "serve":
+        serve(args)
+    else:
+        csv2mse(args)
+
+
+if __name__ == "__main__":
+    if getattr(sys, "frozen", False):
+        # Lets the executable start worker processes for rendering
+        import multiprocessing
+
+        multiprocessing.freeze_support()
+
+    try:
+        run(parse_args())
     except Exception as e:
         print(e)
         input("Press enter key to quit")
@@ -0,0 +1,194 @@
+import collections
+import itertools
+import os
+import queue
+import sys
+import threading
+from typing import Callable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Items each stage can get ahead of the next one
+QUEUE_SIZE = 256
+
+# Items handed to a worker at a time, so the cost of each handoff is shared
+CHUNK_SIZE = 64
+
+# Chunk sizes the executor plan picks between
+MIN_CHUNK_SIZE = 16
+MAX_CHUNK_SIZE = 1024
+
+# Rough wall time to get a pool of workers going, including importing the converter
+THREAD_STARTUP = 0.001
+PROCESS_STARTUP = 0.3
+
+EXECUTORS = ["serial", "thread", "process"]
+
+_DONE = object()
+
+
+class _Failure:
+    """
+    Carries an exception raised in a stage's thread over to the thread reading from it.
+    """
+
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def iter_threaded(items: Iterable[T], maxsize: int = QUEUE_SIZE) -> Iterator[T]:
+    """
+    Iterate over `items` in a background thread, handing each item over through a
+    bounded queue. Chaining these makes each step of a generator pipeline run as its
+    own concurrent stage, e.g. reading the next cards while the current ones are still
+    being written. Errors are re-raised in the consuming thread.
+    """
+    handoff: queue.Queue = queue.Queue(maxsize)
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        # Give up if the consumer has gone away instead of blocking forever
+        while not stop.is_set():
+            try:
+                handoff.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        iterator = iter(items)
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+            put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            # Shut down any earlier stage feeding this one
+            if close := getattr(iterator, "close", None):
+                close()
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while (item := handoff.get()) is not _DONE:
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def is_free_threaded() -> bool:
+    """
+    Check whether the interpreter runs Python code on several threads at once, as the
+    free-threaded builds of Python 3.13 and later can.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def default_executor() -> str:
+    """
+    Pick how to spread work over the CPU cores. Threads are cheapest when they really
+    run in parallel; otherwise separate processes are needed, unless there is only one
+    core anyway.
+    """
+    if (os.cpu_count() or 1) == 1:
+        return "serial"
+    return "thread" if is_free_threaded() else "process"
+
+
+def plan_executor(
+    count: int, seconds_per_item: float, workers: int = 0
+) -> tuple[str, int, int, str]:
+    """
+    Decide how to run `count` items that each take about `seconds_per_item` seconds.
+    Workers are only used when splitting the work between them saves more time than
+    starting them costs. Returns the executor, the number of workers, the chunk size
+    and the reason for the choice.
+    """
+    workers = workers or os.cpu_count() or 1
+    seconds = count * seconds_per_item
+    if workers == 1:
+        return "serial", 1, CHUNK_SIZE, "serially, since there is only one core"
+
+    executor = default_executor()
+    startup = THREAD_STARTUP if executor == "thread" else PROCESS_STARTUP
+    saved = seconds - seconds / workers
+    if saved <= startup:
+        reason = (
+            f"serially, since about {seconds:.2f} s of work doesn't make up for the "
+            f"{startup:.3f} s it takes to start {executor} workers"
+        )
+        return "serial", 1, CHUNK_SIZE, reason
+
+    # A few chunks per worker keeps them all busy without handing off every item
+    chunk_size = max(MIN_CHUNK_SIZE, min(MAX_CHUNK_SIZE, count // (workers * 8)))
+    reason = (
+        f"on {workers} {executor} workers in chunks of {chunk_size}, to split about "
+        f"{seconds:.2f} s of work"
+    )
+    return executor, workers, chunk_size, reason
+
+
+def _map_chunk(func: Callable[[T], R], chunk: list[T]) -> list[R]:
+    return [func(item) for item in chunk]
+
+
+def iter_chunks(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """
+    Split `items` into lists of `size` items, the last one possibly shorter.
+    """
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def map_ordered(
+    func: Callable[[T], R],
+    items: Iterable[T],
+    executor: str = "serial",
+    workers: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[R]:
+    """
+    Apply `func` to every item using the given executor, yielding the results in the
+    same order as the items. Items are handed out in chunks, and only a few chunks per
+    worker are in flight at once, so the input is still streamed. For the process
+    executor, `func` and the items have to be picklable.
+    """
+    if executor == "serial":
+        yield from map(func, items)
+        return
+
+    # Imported here since serial runs, the most common kind, don't need them
+    from concurrent import futures
+
+    workers = workers or os.cpu_count() or 1
+    pool: futures.Executor
+    if executor == "thread":
+        pool = futures.ThreadPoolExecutor(workers)
+    elif executor == "process":
+        import multiprocessing
+
+        # Forking a process that is running other threads can deadlock
+        context = multiprocessing.get_context("spawn")
+        pool = futures.ProcessPoolExecutor(workers, mp_context=context)
+    else:
+        raise ValueError(f"Unknown executor {executor!r}")
+
+    pending: collections.deque = collections.deque()
+    try:
+        for chunk in iter_chunks(items, chunk_size):
+            pending.append(pool.submit(_map_chunk, func, chunk))
+            if len(pending) >= workers * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        pool.shutdown(cancel_futures=True)
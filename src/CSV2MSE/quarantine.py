@@ -0,0 +1,115 @@
+import collections
+import csv
+import io
+import os
+import threading
+from typing import IO, Any, Iterable
+
+HEADER = ["stage", "file", "row", "error"]
+
+# How each stage is described in the summary
+STAGE_VERBS = {"read": "read", "render": "rendered"}
+
+
+class Quarantine:
+    """
+    Collects the rows that couldn't be converted in a CSV file, along with where they
+    came from and what went wrong, so one bad row doesn't stop the rest of the set
+    from being made. The file is only created once a row is added. Rows can be added
+    from several threads at once.
+
+    When `resume` is set, the rows an interrupted run already quarantined are kept
+    and counted, new rows are appended after them, and rows that are read again on
+    the way back to the checkpoint aren't added twice.
+    """
+
+    def __init__(self, filename: str, resume: bool = False) -> None:
+        self.filename = filename
+        self.counts: collections.Counter = collections.Counter()
+        self._lock = threading.Lock()
+        self._file: IO[str] | None = None
+        self._writer: Any = None
+        self._mode = "a" if resume else "w"
+        self._earlier: set[tuple[str, str, str]] = set()
+        if resume and os.path.isfile(filename):
+            self._load_earlier()
+
+    def _load_earlier(self) -> None:
+        """
+        Count the rows left by the interrupted run, and drop its last row if the run
+        stopped while writing it.
+        """
+        with open(
+            self.filename, "r", encoding="utf8", errors="surrogateescape", newline=""
+        ) as f:
+            text = f.read()
+
+        buffer = io.StringIO(text)
+        end = 0
+        for row in csv.reader(buffer):
+            if buffer.tell() == len(text) and not text.endswith("\n"):
+                break
+            end = buffer.tell()
+            if row != HEADER and len(row) >= 3:
+                self._earlier.add((row[0], row[1], row[2]))
+                self.counts[row[0]] += 1
+
+        if end < len(text):
+            os.truncate(
+                self.filename, len(text[:end].encode("utf8", "surrogateescape"))
+            )
+
+    def add(
+        self, stage: str, source: str, row: int, error: str, cells: Iterable[str]
+    ) -> None:
+        """
+        Add a row that failed at `stage` ("read" or "render"), with the file it came
+        from, its row number and the error.
+        """
+        with self._lock:
+            if (stage, source, str(row)) in self._earlier:
+                return
+            if self._writer is None:
+                # Bytes that aren't valid UTF-8 are written back out as they were
+                self._file = open(
+                    self.filename,
+                    self._mode,
+                    encoding="utf8",
+                    errors="surrogateescape",
+                    newline="",
+                )
+                self._writer = csv.writer(self._file)
+                if not self._file.tell():
+                    self._writer.writerow(HEADER)
+            self._writer.writerow([stage, source, row, error, *cells])
+            self.counts[stage] += 1
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+
+    def summary(self) -> str:
+        """
+        Describe how many rows were quarantined at each stage.
+        """
+        total = sum(self.counts.values())
+        stages = ", ".join(
+            f"{count} couldn't be {STAGE_VERBS.get(stage, stage)}"
+            for stage, count in self.counts.items()
+        )
+        return f"Quarantined {total} rows in {self.filename}: {stages}"
+
+    def __enter__(self) -> "Quarantine":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+def remove_stale(filename: str) -> None:
+    """
+    Delete the bad rows an earlier run left in a quarantine file, so they aren't taken
+    for this run's. Only a regular file is deleted, never a link or a device.
+    """
+    if os.path.isfile(filename) and not os.path.islink(filename):
+        os.remove(filename)
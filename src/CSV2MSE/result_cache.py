@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Iterable
+
+import spreadsheet_reader
+
+
+def cache_key(filenames: Iterable[str], config: Any, options: Any = None) -> str:
+    """
+    Hash everything that decides what a run produces: the bytes of every input file,
+    the parsed config file, any options that change the output, and the version of
+    the converter itself.
+    """
+    # Resolving the version can mean asking git, so it is only done when needed
+    import _version
+
+    digest = hashlib.sha256()
+    digest.update(_version.get_versions()["version"].encode("utf8"))
+    digest.update(json.dumps([config, options], sort_keys=True).encode("utf8"))
+
+    for filename in filenames:
+        # Only the file name matters, since it picks the [card:...] section used
+        digest.update(os.path.basename(filename).encode("utf8") + b"\0")
+        path, _ = spreadsheet_reader.split_sheet(filename)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+def lookup(cache_dir: str, key: str) -> str:
+    """
+    Find the cached set for `key`. Returns its path, or an empty string if the cache
+    doesn't have it.
+    """
+    cached = os.path.join(cache_dir, key + ".mse-set")
+    if not os.path.exists(cached):
+        return ""
+
+    # Mark the entry as recently used so it is evicted last
+    os.utime(cached)
+    return cached
+
+
+def store(cache_dir: str, key: str, set_path: str) -> None:
+    """
+    Add a finished set to the cache. The copy is moved into place in one step, so a
+    run that is interrupted never leaves a half-written entry behind.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=cache_dir)
+    os.close(fd)
+    try:
+        shutil.copyfile(set_path, temp_path)
+        os.replace(temp_path, os.path.join(cache_dir, key + ".mse-set"))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def evict(cache_dir: str, max_bytes: int, max_age: float) -> None:
+    """
+    Remove entries that haven't been used for `max_age` seconds, then remove the least
+    recently used entries until the cache is no bigger than `max_bytes`.
+    """
+    if not os.path.isdir(cache_dir):
+        return
+
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(".mse-set") and entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    entries.sort()
+
+    now = time.time()
+    total = sum(size for _, size, _ in entries)
+    for mtime, size, path in entries:
+        if now - mtime <= max_age and total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
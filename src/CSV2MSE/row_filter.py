@@ -0,0 +1,170 @@
+import ast
+import operator
+from typing import Any, Callable, Mapping, TypeVar
+
+T = TypeVar("T")
+
+COMPARISONS: dict[type, Callable[[Any, Any], bool]] = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
+
+# The only functions a filter can call
+FUNCTIONS: dict[str, Callable[[Any], Any]] = {
+    "lower": lambda value: str(value).lower(),
+    "upper": lambda value: str(value).upper(),
+    "len": len,
+}
+
+
+def check_node(node: ast.AST) -> None:
+    """
+    Make sure a filter only uses comparisons, `and`/`or`/`not`, column names, plain
+    values and the functions in `FUNCTIONS`, so it can't run arbitrary code.
+    """
+    if isinstance(node, ast.BoolOp | ast.UnaryOp):
+        if not isinstance(node.op, ast.And | ast.Or | ast.Not | ast.USub):
+            raise ValueError(f"Filters can't use {type(node.op).__name__}")
+        # Only allowed for negative numbers
+        if isinstance(node.op, ast.USub) and not (
+            isinstance(node.operand, ast.Constant)
+            and isinstance(node.operand.value, int | float)
+        ):
+            raise ValueError("Filters can only use - in negative numbers")
+    elif isinstance(node, ast.Compare):
+        for op in node.ops:
+            if type(op) not in COMPARISONS:
+                raise ValueError(f"Filters can't use {type(op).__name__}")
+    elif isinstance(node, ast.Call):
+        if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+            raise ValueError(f"Filters can only call {', '.join(FUNCTIONS)}")
+        if len(node.args) != 1 or node.keywords:
+            raise ValueError(f"{node.func.id}() takes exactly one value")
+        check_node(node.args[0])
+        return
+    elif isinstance(node, ast.Constant):
+        if not isinstance(node.value, str | int | float) or isinstance(
+            node.value, bool
+        ):
+            raise ValueError(f"Filters can't use {node.value!r}")
+    elif not isinstance(
+        node, ast.Name | ast.Tuple | ast.List | ast.Load | ast.boolop | ast.unaryop
+    ) and not isinstance(node, ast.cmpop):
+        raise ValueError(f"Filters can't use {type(node).__name__}")
+
+    for child in ast.iter_child_nodes(node):
+        check_node(child)
+
+
+def parse_filter(
+    expression: str, column_mapping: Mapping[str, str] | None = None
+) -> ast.expr:
+    """
+    Parse a filter expression like `rarity in ("rare", "mythic rare") and power >= 3`.
+    Names can be MSE field names, which are looked up in the column mapping, or
+    column names. Raises ValueError if the expression isn't allowed.
+    """
+    try:
+        tree = ast.parse(expression.strip(), mode="eval").body
+    except SyntaxError as e:
+        raise ValueError(f"Invalid filter {expression!r}: {e.msg}") from None
+    check_node(tree)
+
+    column_mapping = column_mapping or {}
+    functions = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and id(node) not in functions:
+            node.id = column_mapping.get(node.id, node.id).lower()
+    return tree
+
+
+def column_names(tree: ast.expr) -> set[str]:
+    """
+    Get the names of the columns a filter looks at.
+    """
+    functions = {id(node.func) for node in ast.walk(tree) if isinstance(node, ast.Call)}
+    return {
+        node.id
+        for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and id(node) not in functions
+    }
+
+
+def to_number(value: str) -> float | None:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def compare(op: ast.cmpop, a: Any, b: Any) -> bool:
+    """
+    Compare two values, treating a cell as a number when it is compared with one.
+    Cells that aren't numbers, like `*` or an empty cell, are only ever unequal to a
+    number.
+    """
+    if isinstance(a, str) and isinstance(b, int | float):
+        a = to_number(a)
+    elif isinstance(a, int | float) and isinstance(b, str):
+        b = to_number(b)
+    if a is None or b is None:
+        return isinstance(op, ast.NotEq)
+    return COMPARISONS[type(op)](a, b)
+
+
+def compile_filter(
+    tree: ast.expr, getter: Callable[[str], Callable[[T], str]]
+) -> Callable[[T], bool]:
+    """
+    Turn a parsed filter into a function that checks one row. `getter` is called once
+    for each column name and returns a function that gets that column's value from a
+    row, so the filter works on rows of any shape without building dictionaries.
+    """
+
+    def build(node: ast.AST) -> Callable[[T], Any]:
+        if isinstance(node, ast.Constant):
+            value = node.value
+            return lambda row: value
+        elif isinstance(node, ast.Name):
+            return getter(node.id)
+        elif isinstance(node, ast.Tuple | ast.List):
+            items = [build(elt) for elt in node.elts]
+            return lambda row: tuple(item(row) for item in items)
+        elif isinstance(node, ast.Call):
+            func = FUNCTIONS[getattr(node.func, "id")]
+            arg = build(node.args[0])
+            return lambda row: func(arg(row))
+        elif isinstance(node, ast.UnaryOp):
+            operand = build(node.operand)
+            if isinstance(node.op, ast.USub):
+                return lambda row: -operand(row)
+            return lambda row: not operand(row)
+        elif isinstance(node, ast.BoolOp):
+            values = [build(value) for value in node.values]
+            if isinstance(node.op, ast.And):
+                return lambda row: all(value(row) for value in values)
+            return lambda row: any(value(row) for value in values)
+        elif isinstance(node, ast.Compare):
+            left = build(node.left)
+            pairs = [(op, build(comp)) for op, comp in zip(node.ops, node.comparators)]
+
+            def check(row: T) -> bool:
+                a = left(row)
+                for op, right in pairs:
+                    b = right(row)
+                    if not compare(op, a, b):
+                        return False
+                    a = b
+                return True
+
+            return check
+        raise ValueError(f"Filters can't use {type(node).__name__}")
+
+    evaluate = build(tree)
+    return lambda row: bool(evaluate(row))
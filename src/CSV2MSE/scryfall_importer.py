@@ -0,0 +1,79 @@
+from typing import Any, Iterable, Iterator
+
+import decompress
+import json_reader
+
+# Scryfall fields that map directly onto MSE fields
+FACE_FIELDS = {
+    "name": "name",
+    "oracle_text": "rule_text",
+    "flavor_text": "flavor_text",
+    "power": "power",
+    "toughness": "toughness",
+    "loyalty": "loyalty",
+    "artist": "illustrator",
+}
+
+
+def fix_mana_cost(mana_cost: str) -> str:
+    """
+    Convert a Scryfall mana cost like `{2}{W}{W/U}` to the MSE format `2WW/U`.
+    """
+    return mana_cost.replace("{", "").replace("}", "")
+
+
+def convert_face(face: dict[str, Any], suffix: str = "") -> dict[str, str]:
+    """
+    Convert one face of a Scryfall card into MSE fields, adding `suffix` to the field
+    names for the second face.
+    """
+    card = {
+        f"{mse}{suffix}": str(face[field])
+        for field, mse in FACE_FIELDS.items()
+        if face.get(field) is not None
+    }
+
+    if mana_cost := face.get("mana_cost"):
+        card[f"casting_cost{suffix}"] = fix_mana_cost(mana_cost)
+
+    # The supertype and card type are combined into `super_type` anyway
+    super_type, _, sub_type = face.get("type_line", "").partition(" — ")
+    card[f"super_type{suffix}"] = super_type.strip()
+    card[f"sub_type{suffix}"] = sub_type.strip()
+
+    return card
+
+
+def convert_card(data: dict[str, Any]) -> dict[str, str]:
+    """
+    Convert a Scryfall card object into a card dictionary keyed by MSE field names.
+    Multi-faced cards have their second face stored in the `_2` fields.
+    """
+    faces = data.get("card_faces") or [data]
+
+    card = convert_face({**data, **faces[0]})
+    if len(faces) > 1:
+        card.update(convert_face(faces[1], "_2"))
+
+    card["rarity"] = data.get("rarity", "")
+    card["notes"] = data.get("collector_number", "")
+
+    return card
+
+
+def iter_scryfall_cards(
+    filenames: Iterable[str], set_codes: Iterable[str] = ()
+) -> Iterator[dict[str, str]]:
+    """
+    Stream the cards out of Scryfall bulk data files, keeping only the cards from the
+    given sets if any set codes are given. The bulk array is decoded one card at a
+    time, and compressed dumps are decompressed as they are read, so even the largest
+    dumps don't need to fit in memory or be unpacked first.
+    """
+    set_codes = {code.lower() for code in set_codes}
+    for filename in filenames:
+        with decompress.open_text(filename, "utf-8-sig") as f:
+            for data in json_reader.iter_json_values(f):
+                if set_codes and data.get("set", "").lower() not in set_codes:
+                    continue
+                yield convert_card(data)
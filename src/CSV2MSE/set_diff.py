@@ -0,0 +1,99 @@
+import hashlib
+from typing import Iterable, Mapping
+
+import card_importer
+import card_parser
+import set_reader
+
+# Fields that MSE or the importer fill in by themselves
+IGNORED_FIELDS = {"time_created", "time_modified"}
+
+
+def hash_value(val: str) -> bytes:
+    """
+    Hash a field value after removing MSE markup, so that formatting MSE adds on its
+    own when saving a set doesn't show up as a change.
+    """
+    val = card_parser.unfix_symbols(card_parser.unfix_multiline_text(val))
+    return hashlib.blake2b(val.encode("utf8"), digest_size=16).digest()
+
+
+def hash_card(fields: dict[str, str], compared: set[str]) -> dict[str, bytes]:
+    """
+    Hash each compared field of a card. Fields without content are left out.
+    """
+    return {
+        col: hash_value(val)
+        for col, val in fields.items()
+        if val and col in compared and col not in IGNORED_FIELDS
+    }
+
+
+def card_key(name: str, seen: dict[str, int]) -> str:
+    """
+    Identify a card by its name, numbering repeated names in the order they appear.
+    """
+    seen[name] = seen.get(name, 0) + 1
+    return name if seen[name] == 1 else f"{name} #{seen[name]}"
+
+
+def index_set(set_path: str, compared: set[str]) -> dict[str, dict[str, bytes]]:
+    """
+    Read the existing set once and keep only the hashes of each card's fields,
+    indexed by card name.
+    """
+    index, seen = {}, {}
+    for card in set_reader.iter_cards(set_path):
+        name = card_parser.unfix_symbols(card.get("name", ""))
+        index[card_key(name, seen)] = hash_card(card, compared)
+    return index
+
+
+def diff_set(
+    set_path: str, column_mapping: Mapping[str, str], cards: Iterable[dict[str, str]]
+) -> tuple[list[str], list[str], dict[str, list[str]]]:
+    """
+    Compare the cards rendered from the CSV against the cards in an existing set.
+    Returns the names of added and removed cards, and the changed fields of each
+    changed card.
+    """
+    # Planeswalker rules text is written to its own field
+    compared = set(card_parser.planeswalker_columns(column_mapping))
+    index = index_set(set_path, compared)
+
+    added, changed, seen = [], {}, {}
+    for card in cards:
+        # The set only holds rendered fields, and rendering can't be undone (names in
+        # rules text become tags, planeswalker text is split up, types are combined),
+        # so each card is rendered to compare like with like. Only the fields are
+        # rendered, nothing is written.
+        fields = card_importer.render_card(card, column_mapping)
+        name = card_key(card_parser.unfix_symbols(fields.get("name", "")), seen)
+        hashes = hash_card(fields, compared)
+
+        old_hashes = index.pop(name, None)
+        if old_hashes is None:
+            added.append(name)
+        elif hashes != old_hashes:
+            changed[name] = [
+                col
+                for col in dict.fromkeys([*old_hashes, *hashes])
+                if hashes.get(col) != old_hashes.get(col)
+            ]
+
+    return added, list(index), changed
+
+
+def print_diff(
+    added: list[str], removed: list[str], changed: dict[str, list[str]]
+) -> None:
+    """
+    Print a summary of the differences found by `diff_set`.
+    """
+    for name in added:
+        print(f"+ {name}")
+    for name in removed:
+        print(f"- {name}")
+    for name, cols in changed.items():
+        print(f"~ {name}: {', '.join(cols)}")
+    print(f"{len(added)} added, {len(removed)} removed, {len(changed)} changed")
@@ -0,0 +1,79 @@
+import io
+import os
+import zipfile
+from typing import IO, Iterable, Iterator
+
+
+def open_entry(set_path: str, archive: zipfile.ZipFile | None, entry: str) -> IO[str]:
+    """
+    Open a file inside a set as text. Sets can either be zipped, as written by MSE and
+    `zip_set_dir`, or still be a plain directory.
+    """
+    if archive is None:
+        return open(os.path.join(set_path, entry), "r", encoding="utf-8-sig")
+    return io.TextIOWrapper(archive.open(entry), encoding="utf-8-sig")
+
+
+def iter_set_lines(set_path: str, entry: str = "set") -> Iterator[str]:
+    """
+    Stream the lines of the `set` file, replacing each `include_file:` line with the
+    lines of the file it points to.
+    """
+    if os.path.isdir(set_path):
+        yield from _iter_entry_lines(set_path, None, entry)
+    else:
+        with zipfile.ZipFile(set_path) as archive:
+            yield from _iter_entry_lines(set_path, archive, entry)
+
+
+def _iter_entry_lines(
+    set_path: str, archive: zipfile.ZipFile | None, entry: str
+) -> Iterator[str]:
+    with open_entry(set_path, archive, entry) as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if line.startswith("include_file:"):
+                included = line.partition(":")[2].strip()
+                yield from _iter_entry_lines(set_path, archive, included)
+            else:
+                yield line
+
+
+def iter_blocks(lines: Iterable[str]) -> Iterator[tuple[str, str, list[str]]]:
+    """
+    Split MSE's indented file format into top-level `key: value` entries. Yields the
+    key, the inline value and the entry's indented lines with one level of indent
+    removed.
+    """
+    key, value, children = "", "", []
+    for line in lines:
+        # Indented and blank lines belong to the entry above them
+        if not line or line.startswith("\t"):
+            children.append(line[1:])
+            continue
+        if key:
+            yield key, value, children
+        key, _, value = line.partition(":")
+        value, children = value.removeprefix(" "), []
+    if key:
+        yield key, value, children
+
+
+def parse_card(lines: Iterable[str]) -> dict[str, str]:
+    """
+    Read the fields of a `card:` block. Nested and multiline values are returned in
+    the same tab-indented form that `process_csv` writes them in.
+    """
+    card = {}
+    for key, value, children in iter_blocks(lines):
+        card[key] = value + "".join(f"\n\t\t{child}" for child in children)
+    return card
+
+
+def iter_cards(set_path: str) -> Iterator[dict[str, str]]:
+    """
+    Stream each card in the set as a dictionary of its MSE fields.
+    """
+    for key, _, children in iter_blocks(iter_set_lines(set_path)):
+        if key == "card":
+            yield parse_card(children)
@@ -0,0 +1,184 @@
+import copy
+import io
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from typing import IO, Iterable, Mapping
+
+import card_importer
+import card_parser
+import set_diff
+import set_reader
+import sinks
+
+
+def merge_card(
+    old: dict[str, str], new: dict[str, str], compared: set[str], now: str
+) -> dict[str, str]:
+    """
+    Replace the fields of an existing card with the ones rendered from the CSV. Fields
+    the CSV doesn't map, like images or styling set in MSE, are kept as they were.
+    """
+    merged = {
+        col: new.get(col, val)
+        for col, val in old.items()
+        if col not in compared or col in new
+    }
+    merged.update(new)
+    merged["time_created"] = old.get("time_created", now)
+    merged["time_modified"] = now
+    return merged
+
+
+def card_changed(old: dict[str, str], new: dict[str, str], compared: set[str]) -> bool:
+    """
+    Check whether any compared field of a card differs, ignoring the formatting MSE
+    adds by itself, as `diff` does.
+    """
+    return set_diff.hash_card(old, compared) != set_diff.hash_card(new, compared)
+
+
+def write_blocks(
+    lines: Iterable[str],
+    out: IO[str],
+    pending: dict[str, dict[str, str]],
+    seen: dict[str, int],
+    compared: set[str],
+    now: str,
+) -> tuple[list[str], int]:
+    """
+    Copy an MSE file block by block, merging any card found in `pending`. Cards whose
+    compared fields haven't changed are copied as they were, keeping their times.
+    Returns the names of the files it includes and the number of cards changed.
+    """
+    includes, changed = [], 0
+    for key, value, children in set_reader.iter_blocks(lines):
+        if key == "card":
+            old = set_reader.parse_card(children)
+            name = card_parser.unfix_symbols(old.get("name", ""))
+            name = set_diff.card_key(name, seen)
+            new = pending.pop(name, None)
+            if new is not None and card_changed(old, new, compared):
+                out.write(sinks.format_card(merge_card(old, new, compared, now)))
+                changed += 1
+                continue
+        elif key == "include_file":
+            includes.append(value.strip())
+        out.write(f"{key}: {value}\n" if value else f"{key}:\n")
+        out.writelines(f"\t{child}\n" for child in children)
+    return includes, changed
+
+
+def open_text(binary: IO[bytes]) -> IO[str]:
+    """
+    Wrap an archive member opened for writing so text can be written to it.
+    """
+    return io.TextIOWrapper(binary, encoding="utf8")
+
+
+def new_entry(name: str) -> zipfile.ZipInfo:
+    """
+    Describe a new archive member, stamped with the current time.
+    """
+    info = zipfile.ZipInfo(name, time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_DEFLATED
+    return info
+
+
+def copy_entry(
+    archive: zipfile.ZipFile, info: zipfile.ZipInfo, out: zipfile.ZipFile
+) -> None:
+    """
+    Copy an untouched archive member into the new archive, keeping its name, time
+    and compression. It is streamed, so large images aren't held in memory.
+    """
+    # Writing fills in the offsets and sizes, so leave the original's alone
+    entry = copy.copy(info)
+    large = info.file_size > zipfile.ZIP64_LIMIT
+    with archive.open(info) as src, out.open(entry, "w", force_zip64=large) as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+
+
+def update_set(
+    set_path: str,
+    column_mapping: Mapping[str, str],
+    cards: Iterable[dict[str, str]],
+    timestamp: str = "",
+) -> tuple[int, int]:
+    """
+    Update the cards of an existing set with the ones from the CSV instead of
+    rebuilding it. Cards are matched by name; matched cards that changed are
+    replaced, new cards are added, and everything else in the archive, including
+    card files with no changed cards, is copied over unchanged. Returns the number
+    of replaced and added cards.
+    """
+    compared = set(card_parser.planeswalker_columns(column_mapping))
+    now = timestamp or card_parser.get_current_timestamp()
+
+    pending, csv_names = {}, {}
+    for card in cards:
+        fields = card_importer.render_card(card, column_mapping)
+        name = card_parser.unfix_symbols(fields.get("name", ""))
+        pending[set_diff.card_key(name, csv_names)] = fields
+
+    set_dir = os.path.dirname(os.path.abspath(set_path))
+    fd, temp_path = tempfile.mkstemp(suffix=".mse-set", dir=set_dir)
+    os.close(fd)
+    try:
+        with (
+            zipfile.ZipFile(set_path) as archive,
+            zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as out,
+            tempfile.TemporaryFile("w+", encoding="utf8") as set_file,
+        ):
+            # Cards saved by MSE are stored in the set file itself
+            seen: dict[str, int] = {}
+            with set_reader.open_entry(set_path, archive, "set") as f:
+                lines = (line.rstrip("\r\n") for line in f)
+                includes, replaced = write_blocks(
+                    lines, set_file, pending, seen, compared, now
+                )
+
+            # Cards written by the importer are stored in their own files, which
+            # are only rewritten if one of their cards changed
+            rewritten = {"set"}
+            for entry in includes:
+                with set_reader.open_entry(set_path, archive, entry) as f:
+                    lines = [line.rstrip("\r\n") for line in f]
+                text = io.StringIO()
+                _, changed = write_blocks(lines, text, pending, seen, compared, now)
+                if changed:
+                    with out.open(new_entry(entry), "w") as dst, open_text(dst) as f:
+                        f.write(text.getvalue())
+                    rewritten.add(entry)
+                    replaced += changed
+
+            # Anything left over is new to the set
+            names = set(archive.namelist())
+            for ix, fields in enumerate(pending.values()):
+                filename = card_parser.fix_file_name(fields.get("name", ""))
+                filename = filename or f"untitled {ix}"
+                if f"card {filename}" in names:
+                    filename += f" {ix}"
+                names.add(f"card {filename}")
+                fields["time_created"] = fields["time_modified"] = now
+                info = new_entry(f"card {filename}")
+                with out.open(info, "w") as dst, open_text(dst) as f:
+                    f.write("mse_version: 2.0.0\n" + sinks.format_card(fields))
+                set_file.write(f"include_file: card {filename}\n")
+
+            set_file.seek(0)
+            with out.open(new_entry("set"), "w") as dst, open_text(dst) as f:
+                shutil.copyfileobj(set_file, f)
+
+            for info in archive.infolist():
+                if info.filename not in rewritten:
+                    copy_entry(archive, info, out)
+
+        os.replace(temp_path, set_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    return replaced, len(pending)
@@ -0,0 +1,143 @@
+import collections
+import io
+from typing import Any, Mapping
+
+import card_importer
+import card_parser
+import sinks
+
+# Set files kept open at once when splitting by a field, so there can be more shards
+# than the system lets a process have files open
+MAX_OPEN_SHARDS = 64
+
+
+class ShardSink(sinks.Sink):
+    """
+    Splits a set into several .mse-set files, since MSE gets slow with very large
+    sets. A shard is finished once it holds `max_cards` cards or `max_bytes` bytes of
+    card files, and if `field` is given, cards with different values of that field go
+    to different shards. Finished shards are zipped on other threads while the next
+    ones are written.
+
+    When splitting by a field, shards stay open until the end, but only the set files
+    of the `MAX_OPEN_SHARDS` most recently used ones are kept open at a time.
+
+    Each shard gets its own set file from the metadata, titled after the shard, and
+    is named after the set title, the field's value and the shard's number, e.g.
+    `Namekkos 2.mse-set` or `Namekkos NMK 1.mse-set`.
+    """
+
+    def __init__(
+        self,
+        metadata: Mapping[str, str],
+        max_cards: int = 0,
+        max_bytes: int = 0,
+        field: str = "",
+        timestamp: str = "",
+        assume_yes: bool = False,
+    ) -> None:
+        self.metadata = dict(metadata)
+        self.max_cards = max_cards
+        self.max_bytes = max_bytes
+        self.field = field
+        self.timestamp = timestamp
+        self.assume_yes = assume_yes
+
+        # Names of the shards, in the order they were started
+        self.shards: list[str] = []
+
+        # Open shards with their card and byte counts, by field value
+        self._open: dict[str, tuple[sinks.MseSink, list[int]]] = {}
+        # Shards whose set files are open, least recently used first
+        self._active: collections.OrderedDict = collections.OrderedDict()
+        self._numbers: collections.Counter = collections.Counter()
+        self._pool: Any = None
+        self._zipping: list[Any] = []
+
+    def shard_name(self, value: str) -> str:
+        """
+        Name the next shard for cards with the given field value.
+        """
+        parts = [self.metadata["title"]]
+        if self.field:
+            parts.append(card_parser.fix_file_name(value) or "untitled")
+        if self.max_cards or self.max_bytes:
+            self._numbers[value] += 1
+            parts.append(str(self._numbers[value]))
+        return " ".join(parts)
+
+    def start(self, value: str) -> tuple[sinks.MseSink, list[int]]:
+        metadata = {**self.metadata, "title": self.shard_name(value)}
+        set_dir = card_importer.create_set_dir(metadata, self.assume_yes)
+        if not set_dir:
+            raise SystemExit(f"Stopped without overwriting {metadata['title']}")
+
+        self.shards.append(set_dir)
+        self._open[value] = sinks.MseSink(set_dir), [0, 0]
+        return self._open[value]
+
+    def activate(self, value: str, sink: sinks.MseSink) -> None:
+        """
+        Make sure a shard's set file is open, closing the least recently used one if
+        too many are.
+        """
+        if value in self._active:
+            self._active.move_to_end(value)
+            return
+
+        sink.open()
+        self._active[value] = sink
+        if len(self._active) > MAX_OPEN_SHARDS:
+            _, oldest = self._active.popitem(last=False)
+            oldest.close()
+
+    def finish(self, value: str) -> None:
+        """
+        Close a shard and start zipping it in the background.
+        """
+        sink, _ = self._open.pop(value)
+        if self._active.pop(value, None):
+            sink.close()
+        assert self._pool is not None
+        self._zipping.append(
+            self._pool.submit(card_importer.zip_set_dir, sink.set_dir, self.timestamp)
+        )
+
+    def open(self, size: int | None = None) -> None:
+        # Only imported when splitting a set, to keep startup fast
+        from concurrent import futures
+
+        self._pool = futures.ThreadPoolExecutor()
+
+    def add(self, filename: str, fields: Mapping[str, str]) -> None:
+        value = fields.get(self.field, "") if self.field else ""
+        text = sinks.format_card_file(fields)
+        size = len(text.encode("utf8"))
+
+        if value in self._open:
+            _, (cards, total) = self._open[value]
+            if (self.max_cards and cards >= self.max_cards) or (
+                self.max_bytes and cards and total + size > self.max_bytes
+            ):
+                self.finish(value)
+
+        sink, counts = self._open.get(value) or self.start(value)
+        self.activate(value, sink)
+        sink.write_card(filename, text)
+        counts[0] += 1
+        counts[1] += size
+
+    def tell(self) -> int:
+        # main refuses --checkpoint when splitting, so there is nothing to resume from
+        raise io.UnsupportedOperation("Shards can't be checkpointed")
+
+    def close(self) -> None:
+        """
+        Finish every shard that is still open, and wait for all of them to be zipped.
+        """
+        for value in list(self._open):
+            self.finish(value)
+        if self._pool:
+            for future in self._zipping:
+                future.result()
+            self._pool.shutdown()
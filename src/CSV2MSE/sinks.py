@@ -0,0 +1,333 @@
+import abc
+import json
+import os
+import re
+from typing import IO, Mapping
+
+import card_parser
+
+# File extensions of the outputs that can be written alongside the set
+EXPORT_FORMATS = {".xml": "Cockatrice", ".ndjson": "NDJSON", ".jsonl": "NDJSON"}
+
+# Fields only MSE needs, left out of the other outputs
+MSE_ONLY_FIELDS = {"stylesheet", "time_created", "time_modified"}
+
+# Cockatrice's names for the MSE rarities that differ
+COCKATRICE_RARITIES = {
+    "basic land": "common",
+    "mythic rare": "mythic",
+    "masterpiece": "special",
+}
+
+# Card types in the order they decide a card's main type, e.g. an artifact creature
+# is a creature
+MAIN_TYPES = [
+    "Creature",
+    "Land",
+    "Planeswalker",
+    "Battle",
+    "Instant",
+    "Sorcery",
+    "Artifact",
+    "Enchantment",
+]
+
+# Characters that have to be escaped in XML text, and also in attributes
+XML_ESCAPES = str.maketrans({"&": "&amp;", "<": "&lt;", ">": "&gt;"})
+XML_ATTR_ESCAPES = str.maketrans({**XML_ESCAPES, '"': "&quot;"})
+
+COST_SYMBOL = re.compile(r"\{([^}]*)\}|(\d+)|([A-Z])")
+
+
+class Sink(abc.ABC):
+    """
+    Somewhere rendered cards are written to. Every card is rendered once and passed
+    to each sink in turn, so extra outputs only cost writing the card out again. A
+    sink reports its size with `tell`, so an interrupted run can pick up where it
+    left off by opening it again at that size.
+    """
+
+    @abc.abstractmethod
+    def open(self, size: int | None = None) -> None:
+        """
+        Start writing, or carry on from `size` if given.
+        """
+
+    @abc.abstractmethod
+    def add(self, filename: str, fields: Mapping[str, str]) -> None:
+        """
+        Write a card, given the name of its MSE card file and its MSE fields.
+        """
+
+    @abc.abstractmethod
+    def tell(self) -> int:
+        """
+        Get the size written so far, flushing it to disk first.
+        """
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        """
+        Finish writing and close the output.
+        """
+
+
+class MseSink(Sink):
+    """
+    Writes each card to its own file in an MSE set directory and includes it in the
+    set file. The set file is appended to, so a set directory put back by
+    `checkpoint.restore` carries on where it was.
+    """
+
+    def __init__(self, set_dir: str) -> None:
+        self.set_dir = set_dir
+        self._set_file: IO[str] | None = None
+
+    def open(self, size: int | None = None) -> None:
+        self._set_file = open(self.set_dir + "/set", "a", encoding="utf8")
+
+    def add(self, filename: str, fields: Mapping[str, str]) -> None:
+        self.write_card(filename, format_card_file(fields))
+
+    def write_card(self, filename: str, text: str) -> None:
+        """
+        Write a card whose card file has already been formatted.
+        """
+        assert self._set_file is not None
+        # Write each card to its own file
+        path = f"{self.set_dir}/card {filename}"
+        with open(path, "w", encoding="utf8") as card_file:
+            card_file.write(text)
+
+        # Update the set file to include the card
+        # MSE should combine it all into one file automatically
+        self._set_file.write(f"include_file: card {filename}\n")
+
+    def tell(self) -> int:
+        assert self._set_file is not None
+        self._set_file.flush()
+        return self._set_file.tell()
+
+    def close(self) -> None:
+        if self._set_file:
+            self._set_file.close()
+
+
+class FileSink(Sink):
+    """
+    Writes every card to one file, between a header and a footer.
+    """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self._file: IO[str] | None = None
+
+    def header(self) -> str:
+        return ""
+
+    def footer(self) -> str:
+        return ""
+
+    @abc.abstractmethod
+    def format(self, fields: Mapping[str, str]) -> str:
+        """
+        Write out one card's fields as it goes in the file.
+        """
+
+    def open(self, size: int | None = None) -> None:
+        if size is None:
+            self._file = open(self.filename, "w", encoding="utf8", newline="\n")
+            self._file.write(self.header())
+        else:
+            # Drop anything written after the checkpoint, including the footer
+            self._file = open(self.filename, "r+", encoding="utf8", newline="\n")
+            self._file.truncate(size)
+            self._file.seek(size)
+
+    def add(self, filename: str, fields: Mapping[str, str]) -> None:
+        assert self._file is not None
+        self._file.write(self.format(fields))
+
+    def tell(self) -> int:
+        assert self._file is not None
+        self._file.flush()
+        return self._file.tell()
+
+    def close(self) -> None:
+        if self._file:
+            self._file.write(self.footer())
+            self._file.close()
+
+
+class NdjsonSink(FileSink):
+    """
+    Writes each card as a JSON object on its own line, keyed by MSE field name, with
+    the MSE markup taken back out of the text.
+    """
+
+    def format(self, fields: Mapping[str, str]) -> str:
+        return json.dumps(plain_fields(fields), ensure_ascii=False) + "\n"
+
+
+class CockatriceSink(FileSink):
+    """
+    Writes the cards as a Cockatrice card database, so the set can be played in
+    Cockatrice. Only the front face of double-faced and split cards is written.
+    """
+
+    def __init__(self, filename: str, metadata: Mapping[str, str]) -> None:
+        super().__init__(filename)
+        self.set_code = metadata.get("set_code") or metadata.get("title", "")
+        self.title = metadata.get("title", "")
+
+    def header(self) -> str:
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<cockatrice_carddatabase version="4">\n'
+            "  <sets>\n"
+            "    <set>\n"
+            f"      <name>{escape(self.set_code)}</name>\n"
+            f"      <longname>{escape(self.title)}</longname>\n"
+            "      <settype>Custom</settype>\n"
+            "    </set>\n"
+            "  </sets>\n"
+            "  <cards>\n"
+        )
+
+    def footer(self) -> str:
+        return "  </cards>\n</cockatrice_carddatabase>\n"
+
+    def format(self, fields: Mapping[str, str]) -> str:
+        card = plain_fields(fields)
+        card_type = card.get("super_type", "")
+        main_type = main_card_type(card_type)
+        if card.get("sub_type"):
+            card_type += " — " + card["sub_type"]
+        cost = card.get("casting_cost", "")
+        rarity = card.get("rarity", "common")
+
+        props = {
+            "type": card_type,
+            "maintype": main_type,
+            "manacost": cost,
+            "cmc": str(mana_value(cost)),
+            "colors": "".join(color for color in "WUBRG" if color in cost),
+            "loyalty": card.get("loyalty", ""),
+        }
+        if card.get("power") or card.get("toughness"):
+            props["pt"] = f"{card.get('power', '')}/{card.get('toughness', '')}"
+
+        lines = [
+            "    <card>\n",
+            f"      <name>{escape(card.get('name', ''))}</name>\n",
+            f"      <text>{escape(card_text(card))}</text>\n",
+            "      <prop>\n",
+        ]
+        lines.extend(
+            f"        <{prop}>{escape(value)}</{prop}>\n"
+            for prop, value in props.items()
+            if value
+        )
+        lines.append("      </prop>\n")
+        lines.append(
+            f'      <set rarity="{escape(COCKATRICE_RARITIES.get(rarity, rarity), True)}">'
+            f"{escape(self.set_code)}</set>\n"
+        )
+        lines.append(f"      <tablerow>{table_row(main_type)}</tablerow>\n")
+        lines.append("    </card>\n")
+        return "".join(lines)
+
+
+def escape(text: str, attribute: bool = False) -> str:
+    """
+    Escape text to go in an XML element, or in a quoted attribute. This is all the
+    escaping the Cockatrice export needs, and saves importing an XML library on every
+    start.
+    """
+    return text.translate(XML_ATTR_ESCAPES if attribute else XML_ESCAPES)
+
+
+def format_card(fields: Mapping[str, str]) -> str:
+    """
+    Write out a card's fields as a `card:` block, ready to be written in one go.
+    """
+    lines = ["card:\n"]
+    lines.extend(f"\t{col}: {val}\n" for col, val in fields.items())
+    return "".join(lines)
+
+
+def format_card_file(fields: Mapping[str, str]) -> str:
+    """
+    Write out the whole contents of a card's own file in an MSE set.
+    """
+    return "mse_version: 2.0.0\n" + format_card(fields)
+
+
+def plain_fields(fields: Mapping[str, str]) -> dict[str, str]:
+    """
+    Turn a card's MSE fields back into plain text, with mana symbols in braces.
+    """
+    return {
+        col: card_parser.unfix_symbols(card_parser.unfix_multiline_text(val))
+        for col, val in fields.items()
+        if col not in MSE_ONLY_FIELDS
+    }
+
+
+def card_text(card: Mapping[str, str]) -> str:
+    # Planeswalkers keep their rules text in `level_1_text` instead of `rule_text`
+    return card.get("level_1_text") or card.get("rule_text", "")
+
+
+def main_card_type(card_type: str) -> str:
+    """
+    Pick the type Cockatrice sorts a card by from its type line, e.g. `Creature` for
+    a legendary artifact creature.
+    """
+    words = card_type.split()
+    for main_type in MAIN_TYPES:
+        if main_type in words:
+            return main_type
+    return words[-1] if words else ""
+
+
+def mana_value(cost: str) -> int:
+    """
+    Add up the mana value of a casting cost such as `2WW` or `{2}{W}{W}`. `X` counts
+    as nothing and a hybrid symbol such as `2/W` counts as its largest part.
+    """
+    total = 0
+    for symbol, number, letter in COST_SYMBOL.findall(cost.upper()):
+        if number:
+            total += int(number)
+        elif symbol:
+            parts = [int(part) if part.isdigit() else 1 for part in symbol.split("/")]
+            total += 0 if symbol in ["X", "Y", "Z"] else max(parts)
+        elif letter not in "XYZ":
+            total += 1
+    return total
+
+
+def table_row(main_type: str) -> int:
+    """
+    Pick the row of the Cockatrice table a card is played to.
+    """
+    if main_type == "Land":
+        return 0
+    elif main_type == "Creature":
+        return 2
+    elif main_type in ["Instant", "Sorcery"]:
+        return 3
+    return 1
+
+
+def open_export(filename: str, metadata: Mapping[str, str]) -> FileSink:
+    """
+    Make the sink for an extra output, picked by the file's extension.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    if EXPORT_FORMATS.get(ext) == "Cockatrice":
+        return CockatriceSink(filename, metadata)
+    elif EXPORT_FORMATS.get(ext) == "NDJSON":
+        return NdjsonSink(filename)
+    raise ValueError(f"Can't write {filename}, expected {', '.join(EXPORT_FORMATS)}")
@@ -0,0 +1,216 @@
+import posixpath
+import re
+import zipfile
+from typing import Iterator
+from xml.etree import ElementTree as ET
+
+XLSX_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+XLSX_REL_NS = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+PACKAGE_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+ODS_TABLE_NS = "{urn:oasis:names:tc:opendocument:xmlns:table:1.0}"
+ODS_TEXT_NS = "{urn:oasis:names:tc:opendocument:xmlns:text:1.0}"
+ODS_OFFICE_NS = "{urn:oasis:names:tc:opendocument:xmlns:office:1.0}"
+
+# A workbook followed by the sheet to read, e.g. `cards.xlsx#Tokens`
+WORKBOOK_SHEET = re.compile(r"(.*?\.(?:xlsx|ods))#(.*)", re.IGNORECASE | re.DOTALL)
+
+
+def split_sheet(filename: str) -> tuple[str, str]:
+    """
+    Split a `workbook.xlsx#Sheet name` style input into the file name and the sheet
+    name. The sheet name is empty if none was given. Only workbooks have sheets, so
+    any other file name is returned whole, even if it has a `#` in it.
+    """
+    if match := WORKBOOK_SHEET.fullmatch(filename):
+        return match[1], match[2]
+    return filename, ""
+
+
+def column_index(ref: str) -> int:
+    """
+    Convert a cell reference like `AB12` into a zero-based column number.
+    """
+    index = 0
+    for char in ref:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord("A") + 1
+    return index - 1
+
+
+def read_shared_strings(archive: zipfile.ZipFile) -> list[str]:
+    """
+    Read the table of strings that XLSX cells refer to by index.
+    """
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag == f"{XLSX_NS}si":
+                # Rich text is split over several runs; phonetic hints are skipped
+                strings.append(
+                    "".join(
+                        t.text or ""
+                        for t in elem.iter(f"{XLSX_NS}t")
+                        if t not in elem.findall(f"{XLSX_NS}rPh/{XLSX_NS}t")
+                    )
+                )
+                elem.clear()
+    return strings
+
+
+def find_xlsx_sheet(archive: zipfile.ZipFile, sheet: str) -> str:
+    """
+    Find the archive path of a worksheet by name, or of the first worksheet if no name
+    is given.
+    """
+    workbook = ET.fromstring(archive.read("xl/workbook.xml"))
+    rels = ET.fromstring(archive.read("xl/_rels/workbook.xml.rels"))
+    targets = {
+        rel.get("Id"): rel.get("Target", "")
+        for rel in rels.iter(f"{PACKAGE_REL_NS}Relationship")
+    }
+
+    for elem in workbook.iter(f"{XLSX_NS}sheet"):
+        if not sheet or elem.get("name") == sheet:
+            target = targets[elem.get(f"{XLSX_REL_NS}id")]
+            if target.startswith("/"):
+                return target[1:]
+            return posixpath.normpath(posixpath.join("xl", target))
+
+    raise ValueError(f"No sheet named {sheet!r} found")
+
+
+def xlsx_cell_value(cell: ET.Element, shared_strings: list[str]) -> str:
+    """
+    Get the text of an XLSX cell, looking up shared and inline strings.
+    """
+    cell_type = cell.get("t", "n")
+    if cell_type == "inlineStr":
+        return "".join(t.text or "" for t in cell.iter(f"{XLSX_NS}t"))
+
+    value = cell.findtext(f"{XLSX_NS}v") or ""
+    if cell_type == "s" and value:
+        return shared_strings[int(value)]
+    elif cell_type == "b":
+        return "TRUE" if value == "1" else "FALSE"
+    return value
+
+
+def iter_xlsx_rows(filename: str) -> Iterator[list[str]]:
+    """
+    Stream the rows of a worksheet in an XLSX workbook. Only the shared strings are
+    kept in memory; the sheet itself is parsed one row at a time.
+    """
+    path, sheet = split_sheet(filename)
+    with zipfile.ZipFile(path) as archive:
+        shared_strings = read_shared_strings(archive)
+        with archive.open(find_xlsx_sheet(archive, sheet)) as f:
+            sheet_data = None
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    if elem.tag == f"{XLSX_NS}sheetData":
+                        sheet_data = elem
+                    continue
+                if elem.tag != f"{XLSX_NS}row":
+                    continue
+
+                # Empty cells are left out of the file, so fill in the gaps
+                row: list[str] = []
+                for cell in elem.iter(f"{XLSX_NS}c"):
+                    if ref := cell.get("r"):
+                        row.extend([""] * (column_index(ref) - len(row)))
+                    row.append(xlsx_cell_value(cell, shared_strings))
+                yield row
+
+                # Drop parsed rows so memory use doesn't grow with the sheet
+                if sheet_data is not None:
+                    sheet_data.clear()
+
+
+def ods_text(elem: ET.Element) -> str:
+    """
+    Get the text of an ODS paragraph, or of a span of formatted text in one. Runs of
+    spaces, tabs and line breaks are stored as their own elements, and comments are
+    left out.
+    """
+    parts = [elem.text or ""]
+    for child in elem:
+        if child.tag == f"{ODS_TEXT_NS}s":
+            parts.append(" " * int(child.get(f"{ODS_TEXT_NS}c", "1")))
+        elif child.tag == f"{ODS_TEXT_NS}tab":
+            parts.append("\t")
+        elif child.tag == f"{ODS_TEXT_NS}line-break":
+            parts.append("\n")
+        elif child.tag != f"{ODS_OFFICE_NS}annotation":
+            parts.append(ods_text(child))
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def ods_paragraphs(elem: ET.Element) -> Iterator[ET.Element]:
+    """
+    Find the paragraphs of an ODS cell, including those in lists, but not those in
+    comments on the cell.
+    """
+    for child in elem:
+        if child.tag in {f"{ODS_TEXT_NS}p", f"{ODS_TEXT_NS}h"}:
+            yield child
+        elif child.tag != f"{ODS_OFFICE_NS}annotation":
+            yield from ods_paragraphs(child)
+
+
+def ods_cell_text(cell: ET.Element) -> str:
+    """
+    Get the text of an ODS cell. Each paragraph is a line.
+    """
+    return "\n".join(ods_text(paragraph) for paragraph in ods_paragraphs(cell))
+
+
+def iter_ods_rows(filename: str) -> Iterator[list[str]]:
+    """
+    Stream the rows of a sheet in an ODS spreadsheet, one row at a time.
+    """
+    path, sheet = split_sheet(filename)
+    cell_tags = {f"{ODS_TABLE_NS}table-cell", f"{ODS_TABLE_NS}covered-table-cell"}
+
+    with zipfile.ZipFile(path) as archive, archive.open("content.xml") as f:
+        table = None
+        for event, elem in ET.iterparse(f, events=("start", "end")):
+            if elem.tag == f"{ODS_TABLE_NS}table":
+                if event == "start" and table is None:
+                    if not sheet or elem.get(f"{ODS_TABLE_NS}name") == sheet:
+                        table = elem
+                elif event == "end" and elem is table:
+                    return
+                continue
+            if table is None or event != "end":
+                continue
+            if elem.tag != f"{ODS_TABLE_NS}table-row":
+                continue
+
+            # Repeated cells are stored once; trailing blanks are dropped since
+            # spreadsheets pad rows out to thousands of columns
+            row: list[str] = []
+            blanks = 0
+            for cell in elem:
+                if cell.tag not in cell_tags:
+                    continue
+                repeat = int(cell.get(f"{ODS_TABLE_NS}number-columns-repeated", "1"))
+                if text := ods_cell_text(cell):
+                    row.extend([""] * blanks + [text] * repeat)
+                    blanks = 0
+                else:
+                    blanks += repeat
+
+            # Blank rows are skipped when reading cards, so repeats don't matter
+            if row:
+                repeat = int(elem.get(f"{ODS_TABLE_NS}number-rows-repeated", "1"))
+                for _ in range(repeat):
+                    yield list(row)
+            table.clear()
+
+    if table is None:
+        raise ValueError(f"No sheet named {sheet!r} found")
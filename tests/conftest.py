@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules import each other by name, as when main.py is run from src/CSV2MSE
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src", "CSV2MSE"))
@@ -0,0 +1,46 @@
+import csv
+
+import csv_reader
+
+ROWS = [
+    ["name", "rule_text"],
+    ["Aerial Scout", "Flying\nWhen this enters, scry 1."],
+    ["Quoted", 'Say "hi"\n\nthen draw a card.'],
+    ["Plain", "Haste"],
+]
+
+
+def write_rows(path):
+    with open(path, "w", encoding="utf8", newline="") as f:
+        csv.writer(f).writerows(ROWS)
+
+
+def test_boundaries_skip_newlines_in_quotes(tmp_path):
+    path = tmp_path / "cards.csv"
+    write_rows(path)
+    data = path.read_bytes()
+    for chunk_bytes in range(1, len(data) + 1):
+        boundaries = csv_reader.find_record_boundaries(data, chunk_bytes)
+        spans = zip(boundaries, boundaries[1:])
+        rows = [row for span in spans for row in csv_reader.read_chunk(str(path), span)]
+        assert rows == ROWS, chunk_bytes
+
+
+def test_iter_rows_parallel_keeps_order(tmp_path):
+    path = tmp_path / "cards.csv"
+    write_rows(path)
+    rows = csv_reader.iter_rows_parallel(str(path), "thread", 2, chunk_bytes=8)
+    assert list(rows) == ROWS
+
+
+def test_stray_quote_in_unquoted_cell(tmp_path):
+    path = tmp_path / "cards.csv"
+    with open(path, "w", encoding="utf8", newline="") as f:
+        f.write('name,rule_text\nBig 5" Golem,Trample\n')
+        csv.writer(f).writerows(ROWS * 5)
+    with open(path, encoding="utf8") as f:
+        expected = list(csv.reader(f))
+    assert len(expected) == 22
+    for chunk_bytes in [8, 32, 64]:
+        rows = csv_reader.iter_rows_parallel(str(path), "thread", 2, chunk_bytes)
+        assert list(rows) == expected, chunk_bytes
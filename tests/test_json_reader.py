@@ -0,0 +1,36 @@
+import io
+
+import card_importer
+import json_reader
+
+VALUES = '12\n345\n"ab"\ntrue\n[1, 22]\n6'
+
+
+def test_ndjson_scalars_split_across_chunks():
+    for chunk_size in range(1, 8):
+        values = json_reader.iter_json_values(io.StringIO(VALUES), chunk_size)
+        assert list(values) == [12, 345, "ab", True, [1, 22], 6]
+
+
+def test_array_elements_split_across_chunks():
+    for chunk_size in range(1, 8):
+        text = io.StringIO('[12, 345, {"name": "Aerial Scout"}]')
+        values = json_reader.iter_json_values(text, chunk_size)
+        assert list(values) == [12, 345, {"name": "Aerial Scout"}]
+
+
+def test_bad_ndjson_lines_are_skipped():
+    bad = []
+    text = io.StringIO('{"name": "A"}\n{"name": \n{"name": "B"}\n')
+    values = json_reader.iter_json_values(text, 4, lambda *args: bad.append(args))
+    assert list(values) == [{"name": "A"}, {"name": "B"}]
+    assert bad == [('{"name": ', "JSONDecodeError: Expecting ',' delimiter")]
+
+
+def test_broken_array_is_quarantined(tmp_path):
+    path = tmp_path / "cards.json"
+    path.write_text('[{"name": "A"}, {"name": x}, {"name": "B"}]', encoding="utf8")
+    bad = []
+    cards = card_importer.iter_file(str(path), {}, on_error=lambda *a: bad.append(a))
+    assert list(cards) == [{"name": "A"}]
+    assert [(stage, row) for stage, _, row, _, _ in bad] == [("read", 2)]
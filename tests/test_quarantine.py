@@ -0,0 +1,40 @@
+import quarantine
+
+
+def test_opening_leaves_existing_file_alone(tmp_path):
+    path = tmp_path / "cards.csv"
+    path.write_text("name\nAerial Scout\n", encoding="utf8")
+    with quarantine.Quarantine(str(path)) as bad_rows:
+        pass
+    assert not bad_rows.counts
+    assert path.read_text(encoding="utf8") == "name\nAerial Scout\n"
+
+
+def test_remove_stale_only_removes_regular_files(tmp_path):
+    path = tmp_path / "Namekkos.quarantine.csv"
+    link = tmp_path / "link.csv"
+    path.write_text("stage,file,row,error\n", encoding="utf8")
+    link.symlink_to(path)
+    quarantine.remove_stale(str(link))
+    assert link.exists()
+    quarantine.remove_stale(str(path))
+    assert not path.exists()
+
+
+def test_resume_keeps_earlier_rows(tmp_path):
+    path = tmp_path / "Namekkos.quarantine.csv"
+    # The second row was cut off when the earlier run was interrupted
+    path.write_text(
+        'stage,file,row,error\r\nread,cards.csv,10,bad\r\nrender,cards.csv,41,"Key',
+        encoding="utf8",
+    )
+    with quarantine.Quarantine(str(path), resume=True) as bad_rows:
+        assert bad_rows.counts == {"read": 1}
+        bad_rows.add("read", "cards.csv", 10, "bad", [])
+        bad_rows.add("render", "cards.csv", 41, "KeyError: 'name'", [])
+    assert bad_rows.counts == {"read": 1, "render": 1}
+    assert path.read_bytes() == (
+        b"stage,file,row,error\r\n"
+        b"read,cards.csv,10,bad\r\n"
+        b"render,cards.csv,41,KeyError: 'name'\r\n"
+    )
@@ -0,0 +1,34 @@
+import pytest
+
+import row_filter
+
+CARD = {"name": "Aerial Scout", "rarity": "rare", "power": "3"}
+
+
+def matches(expression):
+    tree = row_filter.parse_filter(expression)
+    return row_filter.compile_filter(tree, lambda name: lambda card: card[name])(CARD)
+
+
+def test_filters_compare_columns():
+    assert matches('rarity in ("rare", "mythic rare") and power >= 3')
+    assert not matches('lower(name) == "aerial" or power < -1')
+
+
+@pytest.mark.parametrize(
+    "expression",
+    [
+        "name.__class__",
+        '__import__("os")',
+        "(lambda: 1)()",
+        "name[0]",
+        "power + 1 > 3",
+        'name.lower() == "x"',
+        "open(name)",
+        "[c for c in name]",
+        "True",
+    ],
+)
+def test_filters_reject_other_code(expression):
+    with pytest.raises(ValueError):
+        row_filter.parse_filter(expression)
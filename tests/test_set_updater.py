@@ -0,0 +1,83 @@
+import io
+import zipfile
+
+import set_updater
+
+COLUMNS = {"name": "name", "rule_text": "rule_text"}
+
+SET_FILE = """mse_version: 2.0.0
+game: magic
+set_info:
+\ttitle: Namekkos
+include_file: card Aerial Scout
+include_file: card Aguefield Ox
+"""
+
+CARD_FILE = """mse_version: 2.0.0
+card:
+\tname: {name}
+\trule_text: {text}
+\ttime_created: 2020-01-01 00:00:00
+\ttime_modified: 2020-01-01 00:00:00
+"""
+
+
+class Unseekable(io.RawIOBase):
+    """
+    A write-only stream, so `zipfile` writes each member with a data descriptor.
+    """
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.buffer.write(data)
+
+
+def make_set(path, descriptors=False):
+    stream = Unseekable() if descriptors else open(path, "wb")
+    with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("set", SET_FILE)
+        for name, text in [("Aerial Scout", "Flying"), ("Aguefield Ox", "Vigilance")]:
+            info = zipfile.ZipInfo(f"card {name}", (2020, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, CARD_FILE.format(name=name, text=text))
+        archive.writestr(zipfile.ZipInfo("image1", (2020, 1, 1, 0, 0, 0)), b"\x89PNG")
+    if descriptors:
+        path.write_bytes(stream.buffer.getvalue())
+    stream.close()
+
+
+def check_update(path, descriptors):
+    make_set(path, descriptors)
+    with zipfile.ZipFile(path) as archive:
+        assert all(info.flag_bits & 0x08 for info in archive.infolist()) == descriptors
+
+    cards = [
+        {"name": "Aerial Scout", "rule_text": "Flying"},
+        {"name": "Aguefield Ox", "rule_text": "Haste"},
+    ]
+    counts = set_updater.update_set(str(path), COLUMNS, cards, "2024-05-06 07:08:09")
+    assert counts == (1, 0)
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.testzip() is None
+        infos = {info.filename: info for info in archive.infolist()}
+        assert infos["card Aerial Scout"].date_time == (2020, 1, 1, 0, 0, 0)
+        assert archive.read("card Aerial Scout").decode() == CARD_FILE.format(
+            name="Aerial Scout", text="Flying"
+        )
+        assert "Haste" in archive.read("card Aguefield Ox").decode()
+        assert archive.read("image1") == b"\x89PNG"
+        assert infos["image1"].compress_type == zipfile.ZIP_STORED
+
+
+def test_update_copies_unchanged_members(tmp_path):
+    check_update(tmp_path / "Namekkos.mse-set", descriptors=False)
+
+
+def test_update_copies_members_with_data_descriptors(tmp_path):
+    check_update(tmp_path / "Namekkos.mse-set", descriptors=True)
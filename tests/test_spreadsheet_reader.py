@@ -0,0 +1,53 @@
+from xml.etree import ElementTree as ET
+
+import card_importer
+import spreadsheet_reader
+
+
+def test_split_sheet_workbook():
+    assert spreadsheet_reader.split_sheet("cards.xlsx#Tokens") == (
+        "cards.xlsx",
+        "Tokens",
+    )
+    assert spreadsheet_reader.split_sheet("my #1.ods#Sheet 2") == (
+        "my #1.ods",
+        "Sheet 2",
+    )
+    assert spreadsheet_reader.split_sheet("cards.xlsx") == ("cards.xlsx", "")
+
+
+def test_split_sheet_keeps_hash_in_other_files():
+    assert spreadsheet_reader.split_sheet("set #2.csv") == ("set #2.csv", "")
+    assert spreadsheet_reader.split_sheet("cards#1.json") == ("cards#1.json", "")
+
+
+def test_read_csv_with_hash_in_name(tmp_path):
+    path = tmp_path / "set #2.csv"
+    path.write_text("name,rarity\nAerial Scout,common\n", encoding="utf8")
+    cards = card_importer.read_file(str(path), {})
+    assert cards == [{"name": "Aerial Scout", "rarity": "common"}]
+
+
+def ods_cell(xml):
+    return ET.fromstring(
+        '<table:table-cell xmlns:table="urn:oasis:names:tc:opendocument:xmlns:table:1.0"'
+        ' xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0"'
+        ' xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0">'
+        f"{xml}</table:table-cell>"
+    )
+
+
+def test_ods_cell_text_keeps_formatted_text_in_order():
+    cell = ods_cell(
+        "<text:p>Hello <text:span>big<text:line-break/>world</text:span>!</text:p>"
+        "<text:p>Two<text:s text:c='3'/>spaces</text:p>"
+    )
+    assert spreadsheet_reader.ods_cell_text(cell) == "Hello big\nworld!\nTwo   spaces"
+
+
+def test_ods_cell_text_skips_comments():
+    cell = ods_cell(
+        "<office:annotation><text:p>Check the cost</text:p></office:annotation>"
+        "<text:p>Flying</text:p>"
+    )
+    assert spreadsheet_reader.ods_cell_text(cell) == "Flying"